@@ -0,0 +1,133 @@
+"""
+Per-request CPU cost of the fast-path public endpoints against the DRF stack.
+
+The DRF baselines below reproduce the views as they were before the fast path:
+@api_view with content negotiation, a PaymentSerializer per request and the
+stdlib-backed JSONRenderer. Both versions are called directly with
+RequestFactory requests against a throwaway SQLite database, so the numbers
+include the ORM queries each request makes but not middleware or the network.
+
+    python benchmarks/fast_path.py --requests 2000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'voucher_system.settings')
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def drf_views():
+    """The DRF implementations the fast path replaced."""
+    from rest_framework import status
+    from rest_framework.decorators import api_view, permission_classes, renderer_classes
+    from rest_framework.permissions import AllowAny
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.response import Response
+
+    from vouchers.models import Transaction, Voucher
+    from vouchers.money import as_rupees, format_rupees
+    from vouchers.serializers import PaymentSerializer
+    from vouchers.views import _balance_etag, _payment_response
+
+    @api_view(['POST'])
+    @permission_classes([AllowAny])
+    @renderer_classes([JSONRenderer])
+    def make_payment(request):
+        serializer = PaymentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        amount = serializer.validated_data['amount']
+        transaction = Transaction.objects.create(
+            voucher=serializer.context['voucher'],
+            amount=amount,
+            transaction_type='payment',
+            description=f'Payment of Rs {format_rupees(amount)}',
+        )
+        return Response(_payment_response(transaction), status=status.HTTP_200_OK)
+
+    @api_view(['GET'])
+    @permission_classes([AllowAny])
+    @renderer_classes([JSONRenderer])
+    def check_voucher_balance(request, code):
+        voucher = Voucher.objects.get(code=code)
+        voucher.release_expired_holds()
+        body = {
+            'voucher_code': voucher.code,
+            'balance': as_rupees(voucher.balance),
+            'status': 'active',
+            'message': 'Voucher is active and ready for use'
+        }
+        etag = _balance_etag(body)
+        return Response(body, status=status.HTTP_200_OK, headers={'ETag': etag})
+
+    return make_payment, check_voucher_balance
+
+
+def measure(view, make_request, count, **kwargs):
+    """CPU microseconds per call, rendering the response as the handler would."""
+    started = time.process_time()
+    for _ in range(count):
+        response = view(make_request(), **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    return (time.process_time() - started) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per scenario')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.test import RequestFactory
+
+    from vouchers import renderers, views
+    from vouchers.models import Transaction, Voucher
+
+    creator = User.objects.create(username='fast-path-bench')
+    voucher = Voucher.objects.create(creator=creator)
+    Transaction.objects.create(voucher=voucher, amount=10 ** 9, transaction_type='recharge')
+    factory = RequestFactory()
+
+    def pay(amount):
+        body = json.dumps({'voucher_code': voucher.code, 'amount': amount})
+        return lambda: factory.post('/api/pay/', body, content_type='application/json')
+
+    def balance():
+        return factory.get(f'/api/vouchers/{voucher.code}/balance/')
+
+    drf_payment, drf_balance = drf_views()
+    scenarios = [
+        ('balance check', drf_balance, views.check_voucher_balance, balance, {'code': voucher.code}),
+        ('payment', drf_payment, views.make_payment, pay('1.00'), {}),
+        ('rejected payment', drf_payment, views.make_payment, pay('0.001'), {}),
+    ]
+
+    print(f'orjson: {"yes" if renderers.orjson else "no (stdlib json fallback)"}, {args.requests} requests each')
+    print(f'{"scenario":>18} {"DRF us":>9} {"fast us":>9} {"saved":>7}')
+    for name, drf_view, fast_view, make_request, kwargs in scenarios:
+        # Warm up caches and lazy imports before timing
+        measure(drf_view, make_request, 20, **kwargs)
+        measure(fast_view, make_request, 20, **kwargs)
+        drf = measure(drf_view, make_request, args.requests, **kwargs)
+        fast = measure(fast_view, make_request, args.requests, **kwargs)
+        print(f'{name:>18} {drf:9.1f} {fast:9.1f} {1 - fast / drf:7.0%}')
+
+
+if __name__ == '__main__':
+    main()
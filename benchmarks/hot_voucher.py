@@ -0,0 +1,138 @@
+"""
+Concurrent payments against a single voucher, with and without balance shards.
+
+Runs the same validation and ledger code as POST /api/pay/ from several
+threads at once, first on a plain voucher and then on a sharded one, and
+reports payments per second for each. The final balance is checked against
+the number of successful payments so lost updates show up as a failure.
+
+    python benchmarks/hot_voucher.py --threads 16 --payments 200 --shards 8
+
+By default a throwaway SQLite database is used. SQLite locks the whole file
+for every write, so sharding cannot help there and the sharded run is slower
+(about 153/s unsharded vs 102/s with 8 shards at 8 threads). Pass --settings
+with a module whose DATABASES points at PostgreSQL or MySQL to measure a
+database with row-level locking, and --latency-ms to model the network round
+trip to a database on another host. A payment holds the voucher row lock for
+several statements, so that latency is what makes unsharded payments queue.
+On PostgreSQL 16 with 16 threads and 16 shards (on a single CPU that caps
+the sharded run at about 90/s) sharding measured 0.69x unsharded at 0 ms,
+1.55x at 2 ms and 2.9x at 5 ms per statement.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def setup_django(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module or 'voucher_system.settings')
+    from django.conf import settings
+    database = settings.DATABASES['default']
+    if not settings_module and database['ENGINE'].endswith('sqlite3'):
+        database['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+        database.setdefault('OPTIONS', {})['timeout'] = 60
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def run(code, threads, payments, amount, latency):
+    """
+    Submit threads x payments payments concurrently, waiting latency seconds
+    before each SQL statement. Returns (successes, failures, seconds).
+    """
+    from django.db import connection
+    from vouchers.views import _process_payment
+
+    results = {'ok': 0, 'failed': 0}
+    lock = threading.Lock()
+    start_gate = threading.Barrier(threads + 1)
+
+    def round_trip(execute, sql, params, many, context):
+        time.sleep(latency)
+        return execute(sql, params, many, context)
+
+    def worker():
+        ok = failed = 0
+        start_gate.wait()
+        try:
+            with connection.execute_wrapper(round_trip):
+                for _ in range(payments):
+                    try:
+                        _, status_code = _process_payment({'voucher_code': code, 'amount': amount})
+                    except Exception:
+                        status_code = None
+                    if status_code == 200:
+                        ok += 1
+                    else:
+                        failed += 1
+        finally:
+            connection.close()
+        with lock:
+            results['ok'] += ok
+            results['failed'] += failed
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    start_gate.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return results['ok'], results['failed'], time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--payments', type=int, default=100, help='Payments per thread')
+    parser.add_argument('--shards', type=int, default=8)
+    parser.add_argument('--amount', default='1.00', help='Rupees per payment')
+    parser.add_argument('--settings', help='Django settings module to benchmark against')
+    parser.add_argument(
+        '--latency-ms', type=float, default=0,
+        help='Simulated network round trip added to every SQL statement, as with a database on another host',
+    )
+    args = parser.parse_args()
+
+    setup_django(args.settings)
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from vouchers.models import Transaction, Voucher
+    from vouchers.money import to_paisa
+
+    creator, _ = User.objects.get_or_create(username='hot-voucher-bench')
+    total = args.threads * args.payments
+    initial = to_paisa(args.amount) * total
+
+    print(f'{args.threads} threads x {args.payments} payments of Rs {args.amount} on one voucher, '
+          f'{args.latency_ms:g} ms per statement')
+    rates = []
+    for shards in (0, args.shards):
+        voucher = Voucher.objects.create(creator=creator)
+        Transaction.objects.create(voucher=voucher, amount=initial, transaction_type='recharge')
+        if shards:
+            voucher.set_balance_shards(shards)
+
+        ok, failed, seconds = run(voucher.code, args.threads, args.payments, args.amount, args.latency_ms / 1000)
+
+        voucher.refresh_balance()
+        expected = initial - ok * to_paisa(args.amount)
+        consistent = 'ok' if voucher.balance == expected else f'MISMATCH (expected {expected})'
+        label = f'{shards} shards' if shards else 'unsharded'
+        print(f'{label:>12}: {ok / seconds:8.1f} payments/s  '
+              f'{ok} ok, {failed} failed, balance {voucher.balance} paisa {consistent}')
+        rates.append(ok / seconds)
+
+    print(f'Sharded throughput is {rates[1] / rates[0]:.2f}x unsharded on {connection.vendor}')
+
+
+if __name__ == '__main__':
+    main()
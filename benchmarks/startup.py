@@ -0,0 +1,143 @@
+"""
+Startup time and cold-request latency of the production server.
+
+Launches gunicorn with the project's gunicorn.conf.py against a throwaway
+SQLite database and collected static files, once with preload_app and once
+without, and measures:
+
+- launch to the first static file served (the app is loaded and listening)
+- the first balance check and the first dashboard page, which are what a
+  worker pays for importing views and compiling templates on demand
+- the median of warm requests to the same pages
+- how compressed static assets are served to browsers
+
+    python benchmarks/startup.py --workers 1 --requests 50
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bench_environment(tmp):
+    """Environment pointing Django at a migrated temp database and collected static files."""
+    with open(os.path.join(tmp, 'bench_settings.py'), 'w') as f:
+        f.write(textwrap.dedent(f"""
+            from voucher_system.settings import *  # noqa
+
+            DEBUG = False
+            DATABASES = {{'default': {{'ENGINE': 'django.db.backends.sqlite3', 'NAME': {os.path.join(tmp, 'bench.sqlite3')!r}}}}}
+            STATIC_ROOT = {os.path.join(tmp, 'static')!r}
+        """))
+    env = {
+        **os.environ,
+        'PYTHONPATH': os.pathsep.join([tmp, ROOT, os.environ.get('PYTHONPATH', '')]),
+        'DJANGO_SETTINGS_MODULE': 'bench_settings',
+        'GUNICORN_ACCESS_LOG': '/dev/null',
+    }
+    manage = [sys.executable, os.path.join(ROOT, 'manage.py')]
+    subprocess.run(manage + ['migrate', '--verbosity', '0'], env=env, check=True)
+    subprocess.run(manage + ['collectstatic', '--noinput', '--verbosity', '0'], env=env, check=True)
+    return env
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def get(port, path, headers=None):
+    """(status, response headers, body, seconds) for one request on a new connection."""
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request('GET', path, headers=headers or {})
+        response = connection.getresponse()
+        body = response.read()
+        return response.status, dict(response.getheaders()), body, time.perf_counter() - started
+    finally:
+        connection.close()
+
+
+def wait_until_served(port, path, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            if get(port, path)[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError('gunicorn did not start in time')
+
+
+def run(env, preload, workers, requests, static_path):
+    port = free_port()
+    server_env = {**env, 'GUNICORN_PRELOAD': '1' if preload else '0', 'WEB_CONCURRENCY': str(workers)}
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        ['gunicorn', '--bind', f'127.0.0.1:{port}'], cwd=ROOT, env=server_env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_served(port, static_path, started + 60)
+        results = {'ready': time.perf_counter() - started}
+        for name, path in [('balance', '/api/vouchers/NOSUCHCODE/balance/'), ('dashboard', '/dashboard/')]:
+            results[f'cold {name}'] = get(port, path)[3]
+            results[f'warm {name}'] = statistics.median(get(port, path)[3] for _ in range(requests))
+        return results
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=1, help='Gunicorn workers (default: 1)')
+    parser.add_argument('--requests', type=int, default=50, help='Warm requests per page')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        env = bench_environment(tmp)
+        with open(os.path.join(tmp, 'static', 'staticfiles.json')) as f:
+            static_path = '/static/' + json.load(f)['paths']['js/app.js']
+
+        print(f'{args.workers} worker(s), {args.requests} warm requests per page')
+        runs = {'preload': run(env, True, args.workers, args.requests, static_path),
+                'no preload': run(env, False, args.workers, args.requests, static_path)}
+        print(f'{"":>16}' + ''.join(f'{name:>12}' for name in runs))
+        for metric in runs['preload']:
+            unit, scale = ('s', 1) if metric == 'ready' else ('ms', 1000)
+            print(f'{metric:>16}' + ''.join(f'{run[metric] * scale:>10.1f}{unit:>2}' for run in runs.values()))
+
+        port = free_port()
+        server = subprocess.Popen(['gunicorn', '--bind', f'127.0.0.1:{port}'], cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_served(port, static_path, time.perf_counter() + 60)
+            print(f'\n{static_path}')
+            for encoding in ['br', 'gzip', 'identity']:
+                status, headers, body, _ = get(port, static_path, {'Accept-Encoding': encoding})
+                print(f'  {encoding:>8}: {len(body):>7} bytes, Content-Encoding {headers.get("Content-Encoding", "-")}, '
+                      f'Cache-Control {headers.get("Cache-Control")}')
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Gunicorn configuration for production, loaded automatically from the project
+root (see start_production.sh):
+
+    gunicorn
+
+Workers are uvicorn's ASGI worker so the live dashboard stream (GET
+/api/events/) works. GUNICORN_WORKER_CLASS=gthread serves the WSGI app with
+threaded workers instead; the event stream then answers 501 and the
+dashboard falls back to refetching. Every value can be overridden from the
+environment.
+"""
+import multiprocessing
+import os
+
+CORES = multiprocessing.cpu_count()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn.workers.UvicornWorker')
+wsgi_app = 'voucher_system.wsgi:application' if worker_class == 'gthread' else 'voucher_system.asgi:application'
+
+# One event loop per core. Sync views run in threads off the loop, so ASGI
+# workers need no thread setting; gthread workers get a small pool each,
+# enough to overlap the database round trips of the payment endpoints.
+workers = int(os.environ.get('WEB_CONCURRENCY', CORES))
+threads = int(os.environ.get('GUNICORN_THREADS', 1 if worker_class != 'gthread' else max(2, 8 // CORES)))
+
+# Import Django, the URLconf and the templates once in the master so forked
+# workers share the pages copy-on-write and start answering immediately
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Hold idle connections a little longer than the 60 second idle timeout of
+# common load balancers and proxies, so they never reuse one we just closed
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 65))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers now and then, staggered so they do not all restart at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+
+# Worker heartbeat files on tmpfs, so a slow disk cannot stall the heartbeat
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def when_ready(server):
+    """
+    With preload_app, finish the imports Django otherwise leaves to the first
+    request (URLconf and views, compiled templates, the static manifest)
+    before the workers are forked. No database connection is opened here.
+    """
+    if not preload_app:
+        return
+
+    from django.contrib.staticfiles.storage import staticfiles_storage
+    from django.template.loader import get_template
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    for name in ['vouchers/index.html', 'vouchers/dashboard.html', 'vouchers/payment.html']:
+        get_template(name)
+    staticfiles_storage.url('js/app.js')
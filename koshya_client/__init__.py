@@ -0,0 +1,13 @@
+"""
+Python client for the Koshya voucher API.
+
+    from koshya_client import KoshyaClient
+
+The asyncio client lives in koshya_client.aio and needs httpx:
+
+    from koshya_client.aio import AsyncKoshyaClient
+"""
+from .client import KoshyaClient
+from .exceptions import KoshyaError, PaymentError, TransportError
+
+__all__ = ['KoshyaClient', 'KoshyaError', 'PaymentError', 'TransportError']
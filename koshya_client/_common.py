@@ -0,0 +1,95 @@
+"""Pieces shared by the sync and async clients."""
+import random
+import threading
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+
+from .exceptions import KoshyaError, PaymentError
+
+DEFAULT_BASE_URL = 'http://localhost:8000/api'
+DEFAULT_TIMEOUT = 10.0
+
+# Largest batch /pay/batch/ accepts (the server's default PAYMENT_BATCH_MAX_SIZE)
+MAX_BATCH_SIZE = 100
+
+# Responses worth retrying. Payments always carry a reference, so a retried
+# POST that already went through is replayed by the server, not charged twice.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def new_reference():
+    """Client-generated idempotency key for a payment."""
+    return uuid.uuid4().hex
+
+
+def backoff_delay(attempt, base=0.2, cap=5.0):
+    """Exponential backoff with jitter, in seconds."""
+    return min(cap, base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+
+def payment_payload(voucher_code, amount, reference):
+    """JSON body for one payment. Amounts are sent as strings to keep them exact."""
+    return {
+        'voucher_code': voucher_code,
+        'amount': str(Decimal(str(amount))),
+        'reference': reference,
+    }
+
+
+def auth_headers(token):
+    headers = {'Accept': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Token {token}'
+    return headers
+
+
+def error_from_response(status_code, payload):
+    """Turn an error response into the matching exception."""
+    if isinstance(payload, dict):
+        message = payload.get('error') or payload.get('detail') or payload
+    else:
+        message = payload
+    if status_code == 400:
+        return PaymentError(str(message), status_code, payload)
+    return KoshyaError(f'HTTP {status_code}: {message}', status_code, payload)
+
+
+def batch_error(result):
+    """Exception for a payment that failed inside a batch."""
+    return PaymentError(str(result.get('errors')), 400, result)
+
+
+def missing_result_error(payload):
+    """
+    Exception for a payment the batch response has no result for. Whether it was
+    charged is unknown; retrying with the same reference is safe.
+    """
+    return KoshyaError(f"No result for payment {payload['reference']} in the batch response")
+
+
+class BalanceCache:
+    """Small LRU of balance responses keyed by voucher code, with their ETags."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, code):
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is not None:
+                self._entries.move_to_end(code)
+            return entry
+
+    def put(self, code, etag, body):
+        with self._lock:
+            self._entries[code] = (etag, body)
+            self._entries.move_to_end(code)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, code):
+        with self._lock:
+            self._entries.pop(code, None)
@@ -0,0 +1,155 @@
+"""Asynchronous client built on a pooled httpx.AsyncClient."""
+import asyncio
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    raise ImportError("AsyncKoshyaClient requires 'httpx'. Install it with: pip install httpx")
+
+from ._common import (
+    DEFAULT_BASE_URL, DEFAULT_TIMEOUT, MAX_BATCH_SIZE, RETRY_STATUSES, BalanceCache, auth_headers,
+    backoff_delay, batch_error, error_from_response, missing_result_error, new_reference,
+    payment_payload,
+)
+from .exceptions import TransportError
+
+
+class AsyncKoshyaClient:
+    """
+    asyncio counterpart of KoshyaClient with the same batching and caching behaviour.
+
+        async with AsyncKoshyaClient(token='...') as client:
+            await client.get_balance('ABC12345')
+            await client.debit('ABC12345', '2.50')
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, token=None, timeout=DEFAULT_TIMEOUT,
+                 pool_size=10, max_retries=3, batch_size=50, flush_interval=0.5):
+        self.base_url = base_url.rstrip('/')
+        self.max_retries = max_retries
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.flush_interval = flush_interval
+        self.balances = BalanceCache()
+
+        self.http = httpx.AsyncClient(
+            headers=auth_headers(token),
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+        self._pending = []
+        self._batch_full = asyncio.Event()
+        self._closed = False
+        self._flusher = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # Public API
+
+    async def get_balance(self, voucher_code, use_cache=True):
+        """Return the balance response for a voucher, revalidating the cached copy by ETag."""
+        cached = self.balances.get(voucher_code) if use_cache else None
+        headers = {'If-None-Match': cached[0]} if cached else None
+
+        response = await self._request('GET', f'/vouchers/{voucher_code}/balance/', headers=headers)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        body = self._json(response)
+        if 'ETag' in response.headers:
+            self.balances.put(voucher_code, response.headers['ETag'], body)
+        return body
+
+    async def pay(self, voucher_code, amount, reference=None):
+        """Submit a single payment immediately."""
+        payload = payment_payload(voucher_code, amount, reference or new_reference())
+        response = await self._request('POST', '/pay/', json=payload)
+        self.balances.invalidate(voucher_code)
+        return self._json(response)
+
+    def debit(self, voucher_code, amount, reference=None):
+        """Queue a payment for the next batch. Returns a Future for its result."""
+        if self._closed:
+            raise RuntimeError('Client is closed')
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((payment_payload(voucher_code, amount, reference or new_reference()), future))
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+        if len(self._pending) >= self.batch_size:
+            self._batch_full.set()
+        return future
+
+    async def flush(self):
+        """Submit all queued debits now and wait for them to complete."""
+        batch, self._pending = self._pending, []
+        await self._submit(batch)
+
+    async def close(self):
+        """Flush queued debits, stop the background flusher and release connections."""
+        self._closed = True
+        if self._flusher is not None:
+            self._batch_full.set()
+            await self._flusher
+        await self.flush()
+        await self.http.aclose()
+
+    # Internals
+
+    async def _flush_loop(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_full.clear()
+            if self._closed:
+                return
+            await self.flush()
+
+    async def _submit(self, batch):
+        for start in range(0, len(batch), self.batch_size):
+            chunk = batch[start:start + self.batch_size]
+            try:
+                response = await self._request('POST', '/pay/batch/', json={'payments': [p for p, _ in chunk]})
+                results = self._json(response)['results']
+            except Exception as exc:
+                for _, future in chunk:
+                    future.set_exception(exc)
+                continue
+
+            for (payload, future), result in zip(chunk, results):
+                self.balances.invalidate(payload['voucher_code'])
+                if result['status'] == 'ok':
+                    future.set_result(result)
+                else:
+                    future.set_exception(batch_error(result))
+            # A short response must not leave callers waiting forever
+            for payload, future in chunk[len(results):]:
+                self.balances.invalidate(payload['voucher_code'])
+                future.set_exception(missing_result_error(payload))
+
+    async def _request(self, method, path, **kwargs):
+        url = self.base_url + path
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.http.request(method, url, **kwargs)
+            except httpx.TransportError as exc:
+                if attempt == self.max_retries:
+                    raise TransportError(f'{method} {path} failed: {exc}') from exc
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+            await asyncio.sleep(backoff_delay(attempt))
+
+    @staticmethod
+    def _json(response):
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = response.text
+        if response.status_code >= 400:
+            raise error_from_response(response.status_code, payload)
+        return payload
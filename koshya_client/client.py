@@ -0,0 +1,171 @@
+"""Synchronous client built on a pooled keep-alive requests.Session."""
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # pragma: no cover
+    raise ImportError("KoshyaClient requires 'requests'. Install it with: pip install requests")
+
+from ._common import (
+    DEFAULT_BASE_URL, DEFAULT_TIMEOUT, MAX_BATCH_SIZE, RETRY_STATUSES, BalanceCache, auth_headers,
+    backoff_delay, batch_error, error_from_response, missing_result_error, new_reference,
+    payment_payload,
+)
+from .exceptions import TransportError
+
+
+class KoshyaClient:
+    """
+    Client for the Koshya voucher API.
+
+    All calls share one keep-alive connection pool. debit() buffers payments
+    and submits them to /pay/batch/ when batch_size is reached or every
+    flush_interval seconds, whichever comes first.
+
+        with KoshyaClient(token='...') as client:
+            client.get_balance('ABC12345')
+            future = client.debit('ABC12345', '2.50')
+            future.result()  # waits for the batch that carries it
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, token=None, timeout=DEFAULT_TIMEOUT,
+                 pool_size=10, max_retries=3, batch_size=50, flush_interval=0.5):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.flush_interval = flush_interval
+        self.balances = BalanceCache()
+
+        self.session = requests.Session()
+        self.session.headers.update(auth_headers(token))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._flusher = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Public API
+
+    def get_balance(self, voucher_code, use_cache=True):
+        """Return the balance response for a voucher, revalidating the cached copy by ETag."""
+        cached = self.balances.get(voucher_code) if use_cache else None
+        headers = {'If-None-Match': cached[0]} if cached else None
+
+        response = self._request('GET', f'/vouchers/{voucher_code}/balance/', headers=headers)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        body = self._json(response)
+        if 'ETag' in response.headers:
+            self.balances.put(voucher_code, response.headers['ETag'], body)
+        return body
+
+    def pay(self, voucher_code, amount, reference=None):
+        """Submit a single payment immediately."""
+        payload = payment_payload(voucher_code, amount, reference or new_reference())
+        response = self._request('POST', '/pay/', json=payload)
+        self.balances.invalidate(voucher_code)
+        return self._json(response)
+
+    def debit(self, voucher_code, amount, reference=None):
+        """Queue a payment for the next batch. Returns a Future for its result."""
+        future = Future()
+        payload = payment_payload(voucher_code, amount, reference or new_reference())
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('Client is closed')
+            self._ensure_flusher()
+            self._pending.append((payload, future))
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return future
+
+    def flush(self):
+        """Submit all queued debits now and wait for them to complete."""
+        with self._cond:
+            batch, self._pending = self._pending, []
+        self._submit(batch)
+
+    def close(self):
+        """Flush queued debits, stop the background flusher and release connections."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self.session.close()
+
+    # Internals
+
+    def _ensure_flusher(self):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='koshya-flusher', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+                batch, self._pending = self._pending, []
+            self._submit(batch)
+
+    def _submit(self, batch):
+        for start in range(0, len(batch), self.batch_size):
+            chunk = batch[start:start + self.batch_size]
+            try:
+                response = self._request('POST', '/pay/batch/', json={'payments': [p for p, _ in chunk]})
+                results = self._json(response)['results']
+            except Exception as exc:
+                for _, future in chunk:
+                    future.set_exception(exc)
+                continue
+
+            for (payload, future), result in zip(chunk, results):
+                self.balances.invalidate(payload['voucher_code'])
+                if result['status'] == 'ok':
+                    future.set_result(result)
+                else:
+                    future.set_exception(batch_error(result))
+            # A short response must not leave callers waiting forever
+            for payload, future in chunk[len(results):]:
+                self.balances.invalidate(payload['voucher_code'])
+                future.set_exception(missing_result_error(payload))
+
+    def _request(self, method, path, **kwargs):
+        url = self.base_url + path
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                if attempt == self.max_retries:
+                    raise TransportError(f'{method} {path} failed: {exc}') from exc
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+            time.sleep(backoff_delay(attempt))
+
+    @staticmethod
+    def _json(response):
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = response.text
+        if response.status_code >= 400:
+            raise error_from_response(response.status_code, payload)
+        return payload
@@ -0,0 +1,15 @@
+class KoshyaError(Exception):
+    """Base class for errors raised by the Koshya client."""
+
+    def __init__(self, message, status_code=None, payload=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.payload = payload
+
+
+class PaymentError(KoshyaError):
+    """The server rejected a payment (invalid code, insufficient balance, disabled voucher...)."""
+
+
+class TransportError(KoshyaError):
+    """The request could not be completed after all retries."""
@@ -0,0 +1,29 @@
+#!/bin/bash
+set -e
+
+# Start Production Server Script
+echo "🚀 Starting Voucher System (production)..."
+
+# Activate virtual environment if there is one
+if [ -f venv/bin/activate ]; then
+    source venv/bin/activate
+fi
+
+export DEBUG=${DEBUG:-False}
+
+# Hashed, pre-compressed static files served by WhiteNoise
+echo "📦 Collecting static files..."
+python manage.py collectstatic --noinput --verbosity 0
+
+echo "🗄️ Applying database migrations..."
+python manage.py migrate --noinput
+# Each voucher shard (VOUCHER_SHARD_COUNT > 1) is a separate database with its own migrations
+for alias in $(python manage.py shell -c "from django.conf import settings; print(' '.join(settings.VOUCHER_SHARDS[1:]))"); do
+    echo "🗄️ Applying database migrations to ${alias}..."
+    python manage.py migrate --noinput --database "$alias"
+done
+
+# Workers, threads and keep-alive come from gunicorn.conf.py
+echo "🌐 Starting gunicorn on ${GUNICORN_BIND:-0.0.0.0:8000}..."
+echo "Background workers run separately: python manage.py run_jobs / deliver_webhooks"
+exec gunicorn
@@ -8,6 +8,11 @@ class VoucherApp {
             this.currentPage = 1; // Track current page
             this.itemsPerPage = 5; // Items per page
             this.totalItems = 0; // Total items count
+            this.vouchers = []; // Vouchers loaded for the current tab
+            this.stats = null; // Latest statistics
+            this.creatorNames = {}; // Creator id -> username, for vouchers added by live updates
+            this.eventSource = null;
+            this.liveUpdates = false; // True while the event stream is connected
             this.init();
         }
 
@@ -87,6 +92,7 @@ class VoucherApp {
         }
         this.showDashboard();
         this.loadVouchers();
+        this.connectEvents();
     }
 
     async handleLogin(e) {
@@ -106,6 +112,7 @@ class VoucherApp {
             this.showSuccess('Login successful!');
             this.showDashboard();
             this.loadVouchers();
+            this.connectEvents();
         } catch (error) {
             this.showError('Login failed: ' + error.message);
         }
@@ -123,26 +130,26 @@ class VoucherApp {
         submitBtn.disabled = true;
 
         try {
-            let successCount = 0;
-            let errorCount = 0;
-
-            for (let i = 0; i < count; i++) {
-                try {
-                    await this.apiCall('/vouchers/', 'POST', { initial_value: amount });
-                    successCount++;
-                } catch (error) {
-                    errorCount++;
-                    console.error(`Failed to create voucher ${i + 1}:`, error);
-                }
-            }
+            // The server creates the vouchers in a background job; poll it for progress
+            let job = await this.apiCall('/jobs/', 'POST', {
+                kind: 'bulk_create',
+                initial_value: amount,
+                count: count
+            });
+            job = await this.waitForJob(job, (progress) => {
+                submitBtn.innerHTML = progress.status === 'queued'
+                    ? '<span class="loading"></span> Queued...'
+                    : `<span class="loading"></span> Creating... ${progress.processed}/${count}`;
+            });
 
-            if (successCount > 0) {
-                this.showSuccess(`Successfully created ${successCount} vouchers worth Rs ${amount} each!`);
-                this.loadVouchers();
+            const created = job.result.created || 0;
+            if (created > 0) {
+                this.showSuccess(`Successfully created ${created} vouchers worth Rs ${amount} each!`);
+                this.refreshAfterChange();
             }
             
-            if (errorCount > 0) {
-                this.showError(`Failed to create ${errorCount} vouchers. Check console for details.`);
+            if (job.status !== 'completed') {
+                this.showError(`Voucher creation ${job.status} after ${created} of ${count} vouchers.`);
             }
 
             e.target.reset();
@@ -154,6 +161,18 @@ class VoucherApp {
         }
     }
 
+    async waitForJob(job, onProgress, interval = 1000) {
+        const finished = ['completed', 'failed', 'cancelled'];
+        while (!finished.includes(job.status)) {
+            await new Promise(resolve => setTimeout(resolve, interval));
+            job = await this.apiCall(`/jobs/${job.id}/`, 'GET');
+            if (onProgress) {
+                onProgress(job);
+            }
+        }
+        return job;
+    }
+
         async handleCheckBalance(e) {
             e.preventDefault();
             const formData = new FormData(e.target);
@@ -230,7 +249,7 @@ class VoucherApp {
             try {
                 await this.apiCall(`/vouchers/${voucherCode}/recharge/`, 'POST', { amount });
                 this.showSuccess(`Voucher recharged with Rs ${amount}!`);
-                this.loadVouchers(); // This will update stats too
+                this.refreshAfterChange();
                 e.target.reset();
             } catch (error) {
                 this.showError('Failed to recharge voucher: ' + error.message);
@@ -254,22 +273,158 @@ class VoucherApp {
                 console.log('Received vouchers:', response);
                 
                 // Handle both paginated and non-paginated responses
-                const vouchers = response.results || response;
-                this.totalItems = response.count || vouchers.length;
-                
-                // Apply client-side pagination
-                const startIndex = (this.currentPage - 1) * this.itemsPerPage;
-                const endIndex = startIndex + this.itemsPerPage;
-                const paginatedVouchers = vouchers.slice(startIndex, endIndex);
+                this.vouchers = response.results || response;
+                this.totalItems = response.count || this.vouchers.length;
+                this.vouchers.forEach(voucher => {
+                    if (voucher.creator) {
+                        this.creatorNames[voucher.creator.id] = voucher.creator.username;
+                    }
+                });
                 
-                this.displayVouchers(paginatedVouchers);
-                this.updatePagination();
-                await this.loadStatistics();
+                this.renderVouchers();
+
+                // While the event stream is connected, statistics arrive as deltas
+                if (!this.liveUpdates) {
+                    await this.loadStatistics();
+                }
             } catch (error) {
                 this.showError('Failed to load vouchers: ' + error.message);
             }
         }
 
+        renderVouchers() {
+            // Apply client-side pagination
+            const startIndex = (this.currentPage - 1) * this.itemsPerPage;
+            const endIndex = startIndex + this.itemsPerPage;
+            const paginatedVouchers = this.vouchers.slice(startIndex, endIndex);
+            
+            this.displayVouchers(paginatedVouchers);
+            this.updatePagination();
+        }
+
+        refreshAfterChange() {
+            // Live updates deliver the change; otherwise refetch
+            if (!this.liveUpdates) {
+                this.loadVouchers();
+            }
+        }
+
+        async connectEvents(lastEventId = null) {
+            if (!window.EventSource || !this.token || this.eventSource) {
+                return;
+            }
+
+            // The stream is opened with a short-lived ticket, which keeps the token out of URLs and logs
+            let ticket;
+            try {
+                ticket = (await this.apiCall('/events/ticket/', 'POST')).ticket;
+            } catch (error) {
+                this.liveUpdates = false;
+                return;
+            }
+            if (!this.token || this.eventSource) {
+                return;
+            }
+
+            let url = `${this.apiBase}/events/?ticket=${encodeURIComponent(ticket)}`;
+            if (lastEventId) {
+                url += `&last_event_id=${encodeURIComponent(lastEventId)}`;
+            }
+            const source = new EventSource(url);
+            this.eventSource = source;
+            let opened = false;
+            const on = (name, handler) => source.addEventListener(name, (e) => {
+                if (e.lastEventId) {
+                    lastEventId = e.lastEventId;
+                }
+                handler(e);
+            });
+
+            source.addEventListener('open', () => {
+                opened = true;
+                this.liveUpdates = true;
+            });
+            source.addEventListener('error', () => {
+                if (opened) {
+                    // The ticket has expired by now, so reconnect with a new one from where the stream left off
+                    source.close();
+                    this.eventSource = null;
+                    this.connectEvents(lastEventId);
+                } else if (source.readyState === EventSource.CLOSED) {
+                    // Never connected (e.g. no ASGI server): refetch after each change instead
+                    this.liveUpdates = false;
+                    this.eventSource = null;
+                }
+            });
+            on('statistics', (e) => {
+                this.stats = JSON.parse(e.data);
+                this.updateStatsFromAPI(this.stats);
+            });
+            on('statistics_delta', (e) => {
+                this.applyStatisticsDelta(JSON.parse(e.data));
+            });
+            on('voucher', (e) => {
+                this.applyVoucherChange(JSON.parse(e.data).voucher);
+            });
+            on('transaction', (e) => {
+                this.applyVoucherChange(JSON.parse(e.data).voucher);
+            });
+            source.addEventListener('reset', () => {
+                // Missed too many events to replay; start over
+                this.disconnectEvents();
+                this.loadVouchers();
+                this.connectEvents();
+            });
+        }
+
+        disconnectEvents() {
+            if (this.eventSource) {
+                this.eventSource.close();
+                this.eventSource = null;
+            }
+            this.liveUpdates = false;
+        }
+
+        applyStatisticsDelta(delta) {
+            if (!this.stats) return;
+            Object.entries(delta).forEach(([key, value]) => {
+                this.stats[key] += value;
+            });
+            this.updateStatsFromAPI(this.stats);
+        }
+
+        applyVoucherChange(voucher) {
+            let belongsInTab;
+            if (this.currentTab === 'active') {
+                belongsInTab = !voucher.is_disabled && !voucher.is_sold;
+            } else if (this.currentTab === 'disabled') {
+                belongsInTab = voucher.is_disabled;
+            } else {
+                belongsInTab = voucher.is_sold;
+            }
+
+            const index = this.vouchers.findIndex(v => v.id === voucher.id);
+            if (index !== -1 && belongsInTab) {
+                this.vouchers[index].current_balance = voucher.current_balance;
+                this.vouchers[index].total_loaded = voucher.total_loaded;
+            } else if (index !== -1) {
+                this.vouchers.splice(index, 1);
+                this.totalItems--;
+            } else if (belongsInTab) {
+                const username = this.creatorNames[voucher.creator_id] ||
+                    (voucher.creator_id === this.user.user_id ? this.user.username : 'Unknown');
+                this.vouchers.push({ ...voucher, creator: { id: voucher.creator_id, username } });
+                this.vouchers.sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
+                this.totalItems++;
+            } else {
+                return;
+            }
+
+            const totalPages = Math.max(1, Math.ceil(this.totalItems / this.itemsPerPage));
+            this.currentPage = Math.min(this.currentPage, totalPages);
+            this.renderVouchers();
+        }
+
         switchTab(tab) {
             this.currentTab = tab;
             this.currentPage = 1; // Reset to first page when switching tabs
@@ -293,8 +448,8 @@ class VoucherApp {
 
     async loadStatistics() {
         try {
-            const stats = await this.apiCall('/statistics/', 'GET');
-            this.updateStatsFromAPI(stats);
+            this.stats = await this.apiCall('/statistics/', 'GET');
+            this.updateStatsFromAPI(this.stats);
         } catch (error) {
             console.error('Failed to load statistics:', error);
         }
@@ -459,7 +614,7 @@ class VoucherApp {
             try {
                 const response = await this.apiCall(`/vouchers/${id}/`, 'DELETE');
                 this.showSuccess(response.message || 'Voucher disabled successfully!');
-                this.loadVouchers(); // This will update stats too
+                this.refreshAfterChange();
             } catch (error) {
                 console.error('Disable voucher error:', error);
                 this.showError('Failed to disable voucher: ' + error.message);
@@ -473,7 +628,7 @@ class VoucherApp {
                 // For now, we'll use a PATCH request to enable the voucher
                 const response = await this.apiCall(`/vouchers/${id}/enable/`, 'POST');
                 this.showSuccess(response.message || 'Voucher enabled successfully!');
-                this.loadVouchers(); // This will update stats too
+                this.refreshAfterChange();
             } catch (error) {
                 console.error('Enable voucher error:', error);
                 this.showError('Failed to enable voucher: ' + error.message);
@@ -489,7 +644,7 @@ class VoucherApp {
             // Mark voucher as sold
             const response = await this.apiCall(`/vouchers/${id}/mark-sold/`, 'POST');
             this.showSuccess(`Voucher code ${code} copied to clipboard and marked as sold!`);
-            this.loadVouchers(); // This will update stats too
+            this.refreshAfterChange();
         } catch (error) {
             console.error('Copy and mark sold error:', error);
             this.showError('Failed to copy and mark voucher as sold: ' + error.message);
@@ -592,6 +747,7 @@ class VoucherApp {
     }
 
     logout() {
+        this.disconnectEvents();
         this.token = null;
         this.user = {};
         localStorage.removeItem('auth_token');
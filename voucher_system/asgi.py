@@ -1,11 +1,24 @@
 """
 ASGI config for voucher_system project.
+
+Serve with an ASGI server to enable the live dashboard event stream
+(GET /api/events/), e.g.:
+
+    uvicorn voucher_system.asgi:application
+
+In production, start_production.sh runs it under gunicorn (gunicorn.conf.py).
 """
 
 import os
+import warnings
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'voucher_system.settings')
 
+# WhiteNoise answers static requests with file iterators, which Django reads in
+# one go under ASGI; the files are small and pre-compressed, so the warning
+# Django gives for every one of those responses is noise
+warnings.filterwarnings('ignore', message='StreamingHttpResponse must consume synchronous iterators')
+
 application = get_asgi_application()
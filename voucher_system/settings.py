@@ -33,12 +33,15 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Last, so profiles cover the view only
+    'vouchers.profiling.RequestProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'voucher_system.urls'
@@ -69,6 +72,18 @@ DATABASES = {
     }
 }
 
+# Creator-based sharding: each creator's vouchers and transactions live on one of
+# these aliases (see vouchers/sharding.py). 'default' always comes first and also
+# holds users, tokens and jobs. Shards are SQLite files unless DATABASES defines them.
+VOUCHER_SHARD_COUNT = config('VOUCHER_SHARD_COUNT', default=1, cast=int)
+VOUCHER_SHARDS = ['default'] + [f'shard{index}' for index in range(1, VOUCHER_SHARD_COUNT)]
+for alias in VOUCHER_SHARDS[1:]:
+    DATABASES.setdefault(alias, {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db_{alias}.sqlite3',
+    })
+DATABASE_ROUTERS = ['vouchers.sharding.ShardRouter']
+
 # Password validation - Simplified to only require 8+ characters
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -92,6 +107,18 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
+# collectstatic writes content-hashed copies of every asset plus gzip and brotli
+# variants; WhiteNoise serves the hashed names with a far-future immutable
+# Cache-Control and picks the compressed variant the client accepts
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -103,6 +130,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'vouchers.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
@@ -110,3 +141,41 @@ REST_FRAMEWORK = {
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
+
+# Balance leases (holds) for high-frequency clients
+VOUCHER_HOLD_DEFAULT_TTL = config('VOUCHER_HOLD_DEFAULT_TTL', default=300, cast=int)  # seconds
+VOUCHER_HOLD_MAX_TTL = config('VOUCHER_HOLD_MAX_TTL', default=3600, cast=int)  # seconds
+
+# Maximum number of payments accepted by POST /api/pay/batch/
+PAYMENT_BATCH_MAX_SIZE = config('PAYMENT_BATCH_MAX_SIZE', default=100, cast=int)
+
+# Upper bound for POST /api/vouchers/<id>/shards/
+VOUCHER_MAX_BALANCE_SHARDS = config('VOUCHER_MAX_BALANCE_SHARDS', default=32, cast=int)
+
+# Event outbox and webhook delivery
+VOUCHER_LOW_BALANCE_THRESHOLD = config('VOUCHER_LOW_BALANCE_THRESHOLD', default=50, cast=int)  # Rs
+WEBHOOK_TIMEOUT = config('WEBHOOK_TIMEOUT', default=10, cast=int)  # seconds
+WEBHOOK_MAX_ATTEMPTS = config('WEBHOOK_MAX_ATTEMPTS', default=10, cast=int)
+WEBHOOK_CLAIM_SECONDS = config('WEBHOOK_CLAIM_SECONDS', default=300, cast=int)  # a worker's hold on a batch it is sending
+OUTBOX_RETENTION_DAYS = config('OUTBOX_RETENTION_DAYS', default=7, cast=int)
+
+# Server-Sent Events stream for live dashboards (GET /api/events/, ASGI only)
+EVENT_STREAM_POLL_INTERVAL = config('EVENT_STREAM_POLL_INTERVAL', default=1.0, cast=float)  # seconds
+EVENT_STREAM_HEARTBEAT_SECONDS = 15
+EVENT_STREAM_MAX_SECONDS = config('EVENT_STREAM_MAX_SECONDS', default=300, cast=int)
+EVENT_STREAM_TICKET_SECONDS = config('EVENT_STREAM_TICKET_SECONDS', default=30, cast=int)  # lifetime of a stream ticket
+EVENT_STREAM_RETRY_MS = 3000
+
+# Background jobs (python manage.py run_jobs)
+JOB_FILES_DIR = config('JOB_FILES_DIR', default=str(BASE_DIR / 'job_files'))  # imports and exports
+JOB_CHUNK_SIZE = config('JOB_CHUNK_SIZE', default=100, cast=int)
+JOB_STALE_SECONDS = config('JOB_STALE_SECONDS', default=300, cast=int)  # running jobs without progress are requeued
+JOB_MAX_ATTEMPTS = 3
+JOB_RETENTION_DAYS = config('JOB_RETENTION_DAYS', default=7, cast=int)
+JOB_BULK_CREATE_MAX = config('JOB_BULK_CREATE_MAX', default=10000, cast=int)
+
+# Request profiling: superusers send X-Profile: 1, or a random share of all requests is profiled
+PROFILE_SAMPLE_RATE = config('PROFILE_SAMPLE_RATE', default=0.0, cast=float)  # 0.01 = 1% of requests
+PROFILE_INTERVAL = config('PROFILE_INTERVAL', default=0.002, cast=float)  # seconds between stack samples
+PROFILE_RETENTION = config('PROFILE_RETENTION', default=200, cast=int)  # newest profiles kept
+PROFILE_MAX_QUERIES = 500  # SQL statements kept per profile; all are counted and timed
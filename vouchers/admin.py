@@ -1,18 +1,190 @@
 from django.contrib import admin
-from .models import Voucher, Transaction
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from .models import Voucher, Transaction, DailyUsage, VoucherHold, WebhookEndpoint, OutboxEvent, Job, CreatorShard, RequestProfile
+from .money import format_rupees
+
+
+def estimated_row_count(model, using):
+    """
+    Row count of model's table from the database's planner statistics, or None
+    when the backend keeps none (e.g. SQLite before ANALYZE has been run).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ('SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)', [table]),
+        'mysql': (
+            'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+            [table]
+        ),
+        'sqlite': ('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table]),
+    }
+    if connection.vendor not in queries:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(*queries[connection.vendor])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None or row[0] is None:
+        return None
+    # sqlite_stat1.stat starts with the table's row count
+    estimate = int(float(str(row[0]).split()[0]))
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator that takes the total of an unfiltered list from the
+    planner statistics instead of a COUNT(*) over the whole table. Filtered
+    lists, and tables small enough to count cheaply, still get an exact count.
+    """
+    EXACT_COUNT_BELOW = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.EXACT_COUNT_BELOW:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Admin for tables expected to reach millions of rows: no full-table counts."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+def rupees(field_name, description, ordering=None):
+    """List display column showing a paisa field in rupees."""
+    @admin.display(description=description, ordering=ordering or field_name)
+    def display(obj):
+        value = getattr(obj, field_name)
+        return None if value is None else f'Rs {format_rupees(value)}'
+    return display
 
 
 @admin.register(Voucher)
-class VoucherAdmin(admin.ModelAdmin):
-    list_display = ['code', 'current_balance', 'creator', 'created_at']
-    list_filter = ['creator', 'created_at']
-    search_fields = ['code', 'creator__username']
-    readonly_fields = ['code', 'created_at', 'updated_at']
+class VoucherAdmin(LargeTableAdmin):
+    list_display = ['code', rupees('balance', 'Current balance', ordering='current_balance'), 'creator', 'created_at']
+    list_filter = ['is_sold', 'is_disabled']
+    list_select_related = ['creator']
+    date_hierarchy = 'created_at'
+    autocomplete_fields = ['creator']
+    search_fields = ['code']
+    search_help_text = 'Voucher code prefix or exact creator username.'
+    readonly_fields = ['code', 'balance_shards', 'created_at', 'updated_at']
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Match code prefixes on the code index and usernames exactly, instead of
+        the default LIKE '%term%' scans over both tables. Also serves the
+        voucher autocomplete of other admins.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        prefix_codes = Voucher.objects.code_prefix(search_term).values('pk')
+        creators = User.objects.filter(username=search_term).values('pk')
+        return queryset.filter(Q(pk__in=prefix_codes) | Q(creator__in=creators)), False
+
+
+class VoucherRowAdmin(LargeTableAdmin):
+    """Admin for a large table of rows belonging to a voucher, searched by voucher code prefix."""
+    list_select_related = ['voucher']
+    autocomplete_fields = ['voucher']
+    search_fields = ['voucher__code']
+    search_help_text = 'Voucher code prefix.'
+
+    def get_search_results(self, request, queryset, search_term):
+        """Find rows by voucher code prefix through the code and voucher indexes."""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(voucher__in=Voucher.objects.code_prefix(search_term).values('pk')), False
 
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
-    list_display = ['voucher', 'amount', 'transaction_type', 'created_at']
-    list_filter = ['transaction_type', 'created_at']
-    search_fields = ['voucher__code', 'description']
+class TransactionAdmin(VoucherRowAdmin):
+    list_display = ['voucher', rupees('amount', 'Amount'), 'transaction_type', 'created_at']
+    list_filter = ['transaction_type']
+    date_hierarchy = 'created_at'
     readonly_fields = ['created_at']
+
+
+@admin.register(VoucherHold)
+class VoucherHoldAdmin(VoucherRowAdmin):
+    list_display = ['key', 'voucher', rupees('amount', 'Amount'), rupees('amount_used', 'Amount used'), 'status', 'expires_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['key', 'created_at', 'settled_at']
+
+
+@admin.register(DailyUsage)
+class DailyUsageAdmin(admin.ModelAdmin):
+    list_display = ['day', 'creator', 'transaction_type', 'transaction_count', rupees('total_amount', 'Total amount')]
+    list_filter = ['transaction_type', 'day']
+    list_select_related = ['creator']
+    autocomplete_fields = ['creator']
+    search_fields = ['creator__username']
+
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ['creator', 'url', 'is_active', 'updated_at']
+    list_filter = ['is_active']
+    list_select_related = ['creator']
+    autocomplete_fields = ['creator']
+    search_fields = ['creator__username', 'url']
+    readonly_fields = ['secret', 'created_at', 'updated_at']
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(LargeTableAdmin):
+    list_display = ['id', 'event_type', 'creator', 'status', 'attempts', 'created_at']
+    list_filter = ['status', 'event_type']
+    list_select_related = ['creator']
+    autocomplete_fields = ['creator']
+    search_fields = ['creator__username']
+    readonly_fields = ['created_at', 'delivered_at']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'creator', 'processed', 'total', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    list_select_related = ['creator']
+    autocomplete_fields = ['creator']
+    search_fields = ['creator__username']
+    readonly_fields = ['cursor', 'result', 'error', 'attempts', 'worker', 'heartbeat_at', 'created_at', 'started_at', 'finished_at']
+
+
+@admin.register(CreatorShard)
+class CreatorShardAdmin(admin.ModelAdmin):
+    list_display = ['creator', 'alias']
+    list_filter = ['alias']
+    list_select_related = ['creator']
+    search_fields = ['creator__username']
+    # Moving a creator means moving their vouchers; the placement is read-only here
+    readonly_fields = ['creator', 'alias']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['id', 'method', 'path', 'status_code', 'duration_ms', 'query_count', 'sql_ms', 'trigger', 'created_at']
+    list_filter = ['trigger', 'method']
+    list_select_related = ['user']
+    search_fields = ['path', 'view']
+    readonly_fields = [field.name for field in RequestProfile._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
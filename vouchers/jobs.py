@@ -0,0 +1,357 @@
+"""
+Chunked, resumable background jobs on a database-backed queue.
+
+The run_jobs command claims queued Job rows and runs each one in a process
+pool. Every job kind has a count function, used once to size the progress
+bar, and a chunk function that does a bounded piece of work and advances
+job.cursor and job.processed. A chunk commits in the same transaction as the
+new progress, and only while the claiming worker still owns the job, so a
+cancelled or reclaimed job rolls back the chunk in flight instead of doing
+it twice.
+
+Jobs live on 'default' and the vouchers they work on on their creator's
+shard (see sharding.py). When those differ, a chunk commits the shard first
+and the job's progress right after; a crash between the two commits redoes
+that one chunk when the job resumes.
+"""
+import csv
+import io
+import os
+import socket
+import traceback
+import uuid
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import DateTimeField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Job, Transaction, Voucher
+from .money import format_rupees
+from .serializers import VoucherImportRowSerializer
+from .sharding import SHARDS, creator_read_shard, shard_for_creator
+from .statistics import TRANSACTION_SIGNS
+
+# Cap on per-row details (import errors, reconciliation mismatches) kept in job.result
+MAX_REPORTED_ROWS = 100
+
+EXPORT_COLUMNS = ['code', 'balance', 'total_loaded', 'status', 'created_at', 'sold_at', 'disabled_at']
+
+
+class JobLost(Exception):
+    """The job was cancelled or handed to another worker while a chunk was running."""
+
+
+def job_file_path(job, name):
+    """Path of a file belonging to job under JOB_FILES_DIR."""
+    os.makedirs(settings.JOB_FILES_DIR, exist_ok=True)
+    return os.path.join(settings.JOB_FILES_DIR, f'job-{job.id}-{name}')
+
+
+def scope_shards(job):
+    """Aliases holding vouchers the job's creator may see, in id order."""
+    if job.creator.is_superuser:
+        return SHARDS
+    return [creator_read_shard(job.creator_id)]
+
+
+def vouchers_in_scope(job, alias):
+    """Vouchers on alias the job's creator may see: all of them for superusers, otherwise their own."""
+    if job.creator.is_superuser:
+        return Voucher.objects.using(alias)
+    return Voucher.objects.using(alias).filter(creator_id=job.creator_id)
+
+
+def _next_vouchers(job, size):
+    """
+    Up to size vouchers in scope after the cursor's last_id, in id order. Ids
+    on each shard lie above those of the shards before it, so walking the
+    shards in order keeps the order global.
+    """
+    vouchers = []
+    for alias in scope_shards(job):
+        if len(vouchers) >= size:
+            break
+        vouchers += vouchers_in_scope(job, alias).filter(
+            id__gt=job.cursor.get('last_id', 0)
+        ).order_by('id')[:size - len(vouchers)]
+    return vouchers
+
+
+def _report(job, key, row):
+    rows = job.result.setdefault(key, [])
+    if len(rows) < MAX_REPORTED_ROWS:
+        rows.append(row)
+
+
+# Bulk creation
+
+def _bulk_create_total(job):
+    return job.params['count']
+
+
+def _bulk_create_chunk(job, size):
+    amount = job.params['initial_value']
+    count = min(size, job.total - job.processed)
+    for _ in range(count):
+        voucher = Voucher.objects.create(creator_id=job.creator_id)
+        Transaction.objects.create(
+            voucher=voucher,
+            amount=amount,
+            transaction_type='recharge',
+            description=f'Initial voucher creation with Rs {format_rupees(amount)}'
+        )
+    job.processed += count
+    job.result['created'] = job.processed
+    return job.processed >= job.total
+
+
+# Import
+
+def _open_import(job):
+    return open(job.params['path'], newline='', encoding='utf-8-sig')
+
+
+def _import_total(job):
+    with _open_import(job) as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+def _import_chunk(job, size):
+    """
+    Import the next size rows. The cursor holds the file offset just past the
+    last row imported and the header, so each chunk seeks straight to its rows.
+    """
+    start = job.processed
+    with _open_import(job) as f:
+        # Rows are read with readline(), not by iterating f, so f.tell() stays usable
+        lines = iter(f.readline, '')
+        if 'offset' in job.cursor:
+            f.seek(job.cursor['offset'])
+            reader = csv.DictReader(lines, fieldnames=job.cursor['fieldnames'])
+            rows = list(islice(reader, size))
+        else:
+            reader = csv.DictReader(lines)
+            rows = list(islice(reader, start, start + size))
+        job.cursor = {'offset': f.tell(), 'fieldnames': reader.fieldnames}
+
+    for row_number, row in enumerate(rows, start=start + 1):
+        serializer = VoucherImportRowSerializer(data=row, context={'creator_id': job.creator_id})
+        errors = None
+        if serializer.is_valid():
+            try:
+                with transaction.atomic(using=shard_for_creator(job.creator_id)):
+                    serializer.save(creator_id=job.creator_id)
+            except IntegrityError:
+                # Another writer took the code after validation
+                errors = {'code': [VoucherImportRowSerializer.DUPLICATE_CODE]}
+        else:
+            errors = serializer.errors
+
+        if errors:
+            job.result['skipped'] = job.result.get('skipped', 0) + 1
+            _report(job, 'errors', {'row': row_number, 'errors': errors})
+        else:
+            job.result['created'] = job.result.get('created', 0) + 1
+
+    job.processed += len(rows)
+    return len(rows) < size
+
+
+# Export
+
+def _scope_total(job):
+    return sum(vouchers_in_scope(job, alias).count() for alias in scope_shards(job))
+
+
+def _voucher_status(voucher):
+    if voucher.is_disabled:
+        return 'disabled'
+    return 'sold' if voucher.is_sold else 'active'
+
+
+def _export_chunk(job, size):
+    path = job.cursor.get('path') or job_file_path(job, 'export.csv')
+    offset = job.cursor.get('offset', 0)
+    vouchers = _next_vouchers(job, size)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if offset == 0:
+        writer.writerow(EXPORT_COLUMNS)
+    for voucher in vouchers:
+        writer.writerow([
+            voucher.code,
+            format_rupees(voucher.balance),
+            format_rupees(voucher.total_loaded),
+            _voucher_status(voucher),
+            voucher.created_at.isoformat(),
+            voucher.sold_at.isoformat() if voucher.sold_at else '',
+            voucher.disabled_at.isoformat() if voucher.disabled_at else '',
+        ])
+
+    # Drop anything written by a chunk that did not commit before appending
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(buffer.getvalue().encode())
+        f.flush()
+        os.fsync(f.fileno())
+        offset = f.tell()
+
+    job.cursor = {
+        'path': path,
+        'offset': offset,
+        'last_id': vouchers[-1].id if vouchers else job.cursor.get('last_id', 0),
+    }
+    job.processed += len(vouchers)
+    job.result['rows'] = job.processed
+    return len(vouchers) < size
+
+
+# Reconciliation
+
+def _reconcile_chunk(job, size):
+    vouchers = _next_vouchers(job, size)
+    credits = [kind for kind, sign in TRANSACTION_SIGNS.items() if sign > 0]
+    debits = [kind for kind, sign in TRANSACTION_SIGNS.items() if sign < 0]
+    ledger = {}
+    for alias in {voucher._state.db for voucher in vouchers}:
+        ledger.update(
+            (row['voucher_id'], row)
+            for row in Transaction.objects.using(alias).filter(
+                voucher_id__in=[voucher.id for voucher in vouchers if voucher._state.db == alias]
+            ).order_by().values('voucher_id').annotate(
+                credits=Sum('amount', filter=Q(transaction_type__in=credits)),
+                debits=Sum('amount', filter=Q(transaction_type__in=debits)),
+                loaded=Sum('amount', filter=Q(transaction_type='recharge')),
+            )
+        )
+
+    for voucher in vouchers:
+        row = ledger.get(voucher.id, {})
+        ledger_balance = (row.get('credits') or 0) - (row.get('debits') or 0)
+        ledger_loaded = row.get('loaded') or 0
+        if voucher.balance != ledger_balance or voucher.total_loaded != ledger_loaded:
+            job.result['mismatched'] = job.result.get('mismatched', 0) + 1
+            _report(job, 'mismatches', {
+                'voucher_code': voucher.code,
+                'balance': format_rupees(voucher.balance),
+                'ledger_balance': format_rupees(ledger_balance),
+                'total_loaded': format_rupees(voucher.total_loaded),
+                'ledger_total_loaded': format_rupees(ledger_loaded),
+            })
+
+    if vouchers:
+        job.cursor = {'last_id': vouchers[-1].id}
+    job.processed += len(vouchers)
+    job.result['checked'] = job.processed
+    return len(vouchers) < size
+
+
+# (count, chunk) functions per Job.kind
+JOB_KINDS = {
+    'bulk_create': (_bulk_create_total, _bulk_create_chunk),
+    'import': (_import_total, _import_chunk),
+    'export': (_scope_total, _export_chunk),
+    'reconcile': (_scope_total, _reconcile_chunk),
+}
+
+
+def _save_progress(job, worker):
+    """Store the job's progress, or raise JobLost if worker no longer owns it."""
+    updated = Job.objects.filter(pk=job.pk, status='running', worker=worker).update(
+        total=job.total,
+        processed=job.processed,
+        cursor=job.cursor,
+        result=job.result,
+        heartbeat_at=timezone.now(),
+    )
+    if not updated:
+        raise JobLost(job.pk)
+
+
+def _finish(job, worker, new_status, error=''):
+    now = timezone.now()
+    Job.objects.filter(pk=job.pk, status='running', worker=worker).update(
+        status=new_status, error=error, finished_at=now, heartbeat_at=now
+    )
+
+
+def run_job(job_id, worker):
+    """
+    Run a claimed job to completion, one committed chunk at a time.
+    Returns the job's final status as seen by this worker.
+    """
+    job = Job.objects.select_related('creator').get(pk=job_id)
+    count, chunk = JOB_KINDS[job.kind]
+    try:
+        if job.total is None:
+            job.total = count(job)
+            _save_progress(job, worker)
+
+        finished = False
+        shard = shard_for_creator(job.creator_id)
+        while not finished:
+            with transaction.atomic(), transaction.atomic(using=shard):
+                # Writing the job row first checks ownership before doing any work, and
+                # makes SQLite take its write lock up front instead of failing to upgrade
+                _save_progress(job, worker)
+                finished = chunk(job, settings.JOB_CHUNK_SIZE)
+                _save_progress(job, worker)
+    except JobLost:
+        return Job.objects.values_list('status', flat=True).get(pk=job_id)
+    except Exception:
+        _finish(job, worker, 'failed', traceback.format_exc(limit=5))
+        return 'failed'
+
+    _finish(job, worker, 'completed')
+    return 'completed'
+
+
+def claim_jobs(limit):
+    """Mark up to limit queued jobs as running. Returns (job id, worker token) pairs for run_job."""
+    claimed = []
+    for job_id in Job.objects.filter(status='queued').order_by('id').values_list('id', flat=True)[:limit]:
+        worker = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        now = timezone.now()
+        if Job.objects.filter(pk=job_id, status='queued').update(
+            status='running',
+            worker=worker,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+            started_at=Coalesce('started_at', Value(now, output_field=DateTimeField())),
+        ):
+            claimed.append((job_id, worker))
+    return claimed
+
+
+def requeue_stale_jobs():
+    """
+    Hand running jobs whose worker stopped reporting progress back to the queue,
+    where they resume from their last committed chunk. Jobs that keep stalling
+    are failed instead. Returns (requeued, failed) counts.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status='running', heartbeat_at__lt=now - timedelta(seconds=settings.JOB_STALE_SECONDS)
+    )
+    failed = stale.filter(attempts__gte=settings.JOB_MAX_ATTEMPTS).update(
+        status='failed', error='The worker running this job stopped responding.', finished_at=now
+    )
+    requeued = stale.update(status='queued', worker='')
+    return requeued, failed
+
+
+def purge_finished_jobs():
+    """Delete finished jobs, and their files, older than JOB_RETENTION_DAYS."""
+    cutoff = timezone.now() - timedelta(days=settings.JOB_RETENTION_DAYS)
+    old = Job.objects.filter(status__in=Job.FINISHED_STATUSES, finished_at__lt=cutoff)
+    for job in old:
+        for path in (job.params.get('path'), job.cursor.get('path')):
+            if path and os.path.exists(path):
+                os.remove(path)
+    return old.delete()[0]
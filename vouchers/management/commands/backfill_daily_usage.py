@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils.dateparse import parse_date
+
+from vouchers.models import DailyUsage, Transaction
+from vouchers.sharding import SHARDS
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily usage rollups from the transaction ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Only rebuild days on or after this date (YYYY-MM-DD). Defaults to the full history.',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+
+        deleted = rebuilt = 0
+        for alias in SHARDS:
+            shard_deleted, shard_rebuilt = self.rebuild(alias, since)
+            deleted += shard_deleted
+            rebuilt += shard_rebuilt
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Replaced {deleted} rollup rows with {rebuilt} rows rebuilt from the ledger.'
+        ))
+
+    def rebuild(self, alias, since):
+        """Rebuild the rollups on one shard. Returns (rows deleted, rows created)."""
+        ledger = Transaction.objects.using(alias).annotate(day=TruncDate('created_at'))
+        existing = DailyUsage.objects.using(alias)
+        if since:
+            ledger = ledger.filter(day__gte=since)
+            existing = existing.filter(day__gte=since)
+
+        totals = (
+            ledger.values('voucher__creator_id', 'day', 'transaction_type')
+            .annotate(transaction_count=Count('id'), total_amount=Sum('amount'))
+            .order_by()
+        )
+
+        with transaction.atomic(using=alias):
+            deleted, _ = existing.delete()
+            rows = DailyUsage.objects.using(alias).bulk_create(
+                (
+                    DailyUsage(
+                        creator_id=row['voucher__creator_id'],
+                        day=row['day'],
+                        transaction_type=row['transaction_type'],
+                        transaction_count=row['transaction_count'],
+                        total_amount=row['total_amount'],
+                    )
+                    for row in totals.iterator()
+                ),
+                batch_size=1000,
+            )
+
+        return deleted, len(rows)
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from vouchers.webhooks import deliver_pending, purge_finished
+
+
+class Command(BaseCommand):
+    help = 'Deliver outbox events to creators\' webhook endpoints as batched, signed requests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Maximum events per webhook request (default: 100).')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to wait when there is nothing to deliver (default: 2).')
+        parser.add_argument('--once', action='store_true',
+                            help='Deliver one round of due events and exit.')
+
+    def handle(self, *args, **options):
+        last_purge = 0
+        while True:
+            counts = deliver_pending(options['batch_size'])
+            if any(counts.values()):
+                self.stdout.write(', '.join(f'{count} {outcome}' for outcome, count in counts.items()))
+
+            if time.monotonic() - last_purge > 3600:
+                purge_finished()
+                last_purge = time.monotonic()
+
+            if options['once']:
+                return
+            if not any(counts.values()):
+                time.sleep(options['interval'])
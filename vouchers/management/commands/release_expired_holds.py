@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from vouchers.models import VoucherHold
+from vouchers.sharding import SHARDS
+
+
+class Command(BaseCommand):
+    help = 'Return the balance of holds that passed their expiry without being settled.'
+
+    def handle(self, *args, **options):
+        released = 0
+        for alias in SHARDS:
+            overdue = VoucherHold.objects.using(alias).filter(
+                status='active', expires_at__lte=timezone.now()
+            ).select_related('voucher')
+            for hold in overdue.iterator():
+                released += hold.expire()
+
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired holds.'))
@@ -0,0 +1,65 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+
+
+def _init_worker():
+    # Pool processes are spawned fresh, so they need their own app registry and DB connections
+    django.setup()
+
+
+def _run_job(job_id, worker):
+    from vouchers.jobs import run_job
+    return job_id, run_job(job_id, worker)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (bulk creation, import, export, reconciliation) in a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Jobs to run at the same time (default: number of CPUs).')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds between queue checks (default: 2).')
+        parser.add_argument('--once', action='store_true',
+                            help='Run the jobs queued now, wait for them to finish and exit.')
+
+    def handle(self, *args, **options):
+        from vouchers.jobs import claim_jobs, purge_finished_jobs, requeue_stale_jobs
+
+        processes = max(1, options['processes'])
+        running = set()
+        last_purge = 0
+
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        ) as pool:
+            while True:
+                requeued, failed = requeue_stale_jobs()
+                if requeued or failed:
+                    self.stdout.write(f'Requeued {requeued} stalled jobs, failed {failed}.')
+
+                for job_id, worker in claim_jobs(processes - len(running)):
+                    running.add(pool.submit(_run_job, job_id, worker))
+                    self.stdout.write(f'Started job {job_id}.')
+
+                if time.monotonic() - last_purge > 3600:
+                    purge_finished_jobs()
+                    last_purge = time.monotonic()
+
+                if not running:
+                    if options['once']:
+                        return
+                    time.sleep(options['interval'])
+                    continue
+
+                done, running = wait(running, timeout=options['interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id, status = future.result()
+                    self.stdout.write(f'Job {job_id} {status}.')
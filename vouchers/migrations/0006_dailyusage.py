@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('vouchers', '0005_rename_deleted_at_voucher_disabled_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('recharge', 'Recharge'), ('payment', 'Payment')], max_length=10)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=12)),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['day', 'transaction_type'],
+                'indexes': [models.Index(fields=['day', 'transaction_type'], name='daily_usage_day_type_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyusage',
+            constraint=models.UniqueConstraint(fields=('creator', 'day', 'transaction_type'), name='unique_daily_usage_per_creator_day_type'),
+        ),
+    ]
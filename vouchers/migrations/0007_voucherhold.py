@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vouchers', '0006_dailyusage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyusage',
+            name='transaction_type',
+            field=models.CharField(choices=[('recharge', 'Recharge'), ('payment', 'Payment'), ('hold', 'Hold'), ('release', 'Hold Release')], max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('recharge', 'Recharge'), ('payment', 'Payment'), ('hold', 'Hold'), ('release', 'Hold Release')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='VoucherHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('amount_used', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('settled', 'Settled'), ('expired', 'Expired')], default='active', max_length=10)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('settled_at', models.DateTimeField(blank=True, null=True)),
+                ('voucher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='vouchers.voucher')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='hold_status_expiry_idx')],
+            },
+        ),
+    ]
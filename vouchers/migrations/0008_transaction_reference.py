@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vouchers', '0007_voucherhold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='reference',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
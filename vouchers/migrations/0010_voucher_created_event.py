@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vouchers', '0009_outbox_webhooks'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxevent',
+            name='event_type',
+            field=models.CharField(choices=[('voucher.created', 'Voucher Created'), ('transaction.created', 'Transaction Created'), ('voucher.low_balance', 'Voucher Low Balance'), ('voucher.disabled', 'Voucher Disabled'), ('voucher.enabled', 'Voucher Enabled'), ('voucher.sold', 'Voucher Sold')], max_length=30),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(fields=['creator', 'id'], name='outbox_creator_id_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Store money as integer paisa instead of DECIMAL(10, 2) rupees.
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Cast, Round
+import vouchers.money
+
+# (model, field, nullable, default, max_digits)
+MONEY_FIELDS = [
+    ('voucher', 'current_balance', False, 0, 10),
+    ('voucher', 'total_loaded', False, 0, 10),
+    ('transaction', 'amount', False, None, 10),
+    ('voucherhold', 'amount', False, None, 10),
+    ('voucherhold', 'amount_used', True, None, 10),
+    ('dailyusage', 'total_amount', False, 0, 12),
+]
+
+
+def decimals_to_paisa(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    for model_name, field, *_ in MONEY_FIELDS:
+        model = apps.get_model('vouchers', model_name)
+        model.objects.using(db_alias).filter(**{f'{field}__isnull': False}).update(**{
+            f'{field}_paisa': Cast(Round(F(field) * 100), models.BigIntegerField())
+        })
+
+
+def paisa_to_decimals(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    for model_name, field, *_ in MONEY_FIELDS:
+        model = apps.get_model('vouchers', model_name)
+        rows = list(model.objects.using(db_alias).filter(**{f'{field}_paisa__isnull': False}).only('pk', f'{field}_paisa'))
+        for row in rows:
+            setattr(row, field, Decimal(getattr(row, f'{field}_paisa')) / 100)
+        model.objects.using(db_alias).bulk_update(rows, [field], batch_size=1000)
+
+
+def paisa_field(nullable, default):
+    kwargs = {'help_text': 'Amount in paisa (1 Rs = 100 paisa)'}
+    if nullable:
+        kwargs.update(null=True, blank=True)
+    else:
+        kwargs['default'] = 0 if default is None else default
+    return vouchers.money.PaisaField(**kwargs)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vouchers', '0010_voucher_created_event'),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(
+                model_name=model_name,
+                name=f'{field}_paisa',
+                field=paisa_field(nullable, default),
+                preserve_default=nullable or default is not None,
+            )
+            for model_name, field, nullable, default, _ in MONEY_FIELDS
+        ],
+        # Relax the old columns so that unapplying can re-add them before refilling
+        *[
+            migrations.AlterField(
+                model_name=model_name,
+                name=field,
+                field=models.DecimalField(max_digits=max_digits, decimal_places=2, null=True, blank=nullable),
+            )
+            for model_name, field, nullable, _, max_digits in MONEY_FIELDS
+            if not nullable
+        ],
+        migrations.RunPython(decimals_to_paisa, paisa_to_decimals),
+        *[
+            migrations.RemoveField(model_name=model_name, name=field)
+            for model_name, field, *_ in MONEY_FIELDS
+        ],
+        *[
+            migrations.RenameField(model_name=model_name, old_name=f'{field}_paisa', new_name=field)
+            for model_name, field, *_ in MONEY_FIELDS
+        ],
+    ]
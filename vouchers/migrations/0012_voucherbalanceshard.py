@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+import vouchers.money
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vouchers', '0011_money_in_paisa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voucher',
+            name='balance_shards',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Number of VoucherBalanceShard rows holding the balance; 0 keeps it in current_balance.'),
+        ),
+        migrations.CreateModel(
+            name='VoucherBalanceShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('balance', vouchers.money.PaisaField(default=0, help_text='Amount in paisa (1 Rs = 100 paisa)')),
+                ('voucher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='vouchers.voucher')),
+            ],
+            options={
+                'ordering': ['voucher', 'index'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='voucherbalanceshard',
+            constraint=models.UniqueConstraint(fields=('voucher', 'index'), name='unique_balance_shard_per_voucher'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vouchers', '0013_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='voucher',
+            index=models.Index(fields=['created_at'], name='voucher_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voucher',
+            index=models.Index(fields=['creator', 'created_at'], name='voucher_creator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voucher',
+            index=models.Index(fields=['current_balance'], name='voucher_balance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voucher',
+            index=models.Index(fields=['sold_at'], name='voucher_sold_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voucher',
+            index=models.Index(condition=models.Q(('is_disabled', True)), fields=['created_at'], name='voucher_disabled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voucher',
+            index=models.Index(condition=models.Q(('is_disabled', False), ('is_sold', True)), fields=['created_at'], name='voucher_sold_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voucher',
+            index=models.Index(condition=models.Q(('balance_shards__gt', 0)), fields=['balance_shards'], name='voucher_sharded_idx'),
+        ),
+    ]
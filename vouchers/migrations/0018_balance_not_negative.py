@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:36
+
+from django.db import migrations, models
+
+
+def check_no_negative_balances(apps, schema_editor):
+    """
+    Ledgers written before balances were updated conditionally could overdraw a
+    voucher. Stop with the affected vouchers listed rather than fail half way
+    through adding the constraint; see "Negative balances" in README.md.
+    """
+    db_alias = schema_editor.connection.alias
+    Voucher = apps.get_model('vouchers', 'Voucher')
+    VoucherBalanceShard = apps.get_model('vouchers', 'VoucherBalanceShard')
+    negative = list(
+        Voucher.objects.using(db_alias).filter(current_balance__lt=0)
+        .order_by('id').values_list('code', 'current_balance')[:20]
+    )
+    negative += [
+        (code, f'{balance} (shard)') for code, balance in
+        VoucherBalanceShard.objects.using(db_alias).filter(balance__lt=0)
+        .order_by('id').values_list('voucher__code', 'balance')[:20]
+    ]
+    if negative:
+        listed = ', '.join(f'{code}: {balance} paisa' for code, balance in negative)
+        raise RuntimeError(
+            f"Database '{db_alias}' has vouchers with a negative balance ({listed}). "
+            f"Correct or zero them, e.g. with `python manage.py shell -c \"from vouchers.models import Voucher; "
+            f"Voucher.objects.using('{db_alias}').filter(current_balance__lt=0).update(current_balance=0)\"`, "
+            f"then run migrate again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vouchers', '0017_request_profiles'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_no_negative_balances, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='voucher',
+            constraint=models.CheckConstraint(check=models.Q(('current_balance__gte', 0)), name='voucher_balance_not_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='voucherbalanceshard',
+            constraint=models.CheckConstraint(check=models.Q(('balance__gte', 0)), name='balance_shard_not_negative'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vouchers', '0019_outbox_claims'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='dailyusage',
+            name='unique_daily_usage_per_creator_day_type',
+        ),
+        migrations.AddField(
+            model_name='dailyusage',
+            name='slot',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyusage',
+            constraint=models.UniqueConstraint(fields=('creator', 'day', 'transaction_type', 'slot'), name='unique_daily_usage_per_creator_day_type_slot'),
+        ),
+    ]
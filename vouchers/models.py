@@ -1,14 +1,71 @@
-from django.db import models
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.utils import timezone
+from datetime import timedelta
+from .money import PaisaField, format_rupees, to_paisa
+from .sharding import new_hold_key, new_voucher_code, shard_for_creator
+import random
+import secrets
 import uuid
 
 
+class InsufficientBalance(Exception):
+    """Raised when a debit would take a voucher's balance below zero."""
+
+
+class VoucherQuerySet(models.QuerySet):
+    """Voucher lookups phrased so that an index can answer them."""
+
+    def code_prefix(self, prefix):
+        """
+        Vouchers whose code starts with prefix, either as given or upper-cased
+        like generated codes. Written as ranges on the unique code index, since
+        startswith compiles to a LIKE that SQLite cannot serve from an index; the
+        startswith only rechecks rows inside a range.
+        """
+        matches = Q()
+        for start in dict.fromkeys([prefix.upper(), prefix]):
+            end = start[:-1] + chr(ord(start[-1]) + 1)
+            matches |= Q(code__gte=start, code__lt=end, code__startswith=start)
+        return self.filter(matches)
+
+    def balance_between(self, minimum=None, maximum=None):
+        """
+        Vouchers whose spendable balance, in paisa, is within the inclusive bounds.
+        Unsharded vouchers are matched on current_balance; the few sharded ones
+        have their shard totals summed through the partial sharded-voucher index.
+        """
+        bounds = {}
+        if minimum is not None:
+            bounds['gte'] = minimum
+        if maximum is not None:
+            bounds['lte'] = maximum
+
+        shard_total = (
+            VoucherBalanceShard.objects.filter(voucher=OuterRef('pk'))
+            .order_by().values('voucher').annotate(total=Sum('balance')).values('total')
+        )
+        sharded = (
+            Voucher.objects.filter(balance_shards__gt=0)
+            .annotate(spendable=F('current_balance') + Coalesce(Subquery(shard_total), 0))
+            .filter(**{f'spendable__{lookup}': value for lookup, value in bounds.items()})
+            .values('pk')
+        )
+        unsharded = Q(balance_shards=0, **{f'current_balance__{lookup}': value for lookup, value in bounds.items()})
+        return self.filter(unsharded | Q(pk__in=sharded))
+
+
 class Voucher(models.Model):
-    """Model representing a voucher with unique code and balance."""
+    """Model representing a voucher with unique code and balance. Amounts are in paisa."""
     code = models.CharField(max_length=20, unique=True)
-    current_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    total_loaded = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_vouchers')
+    current_balance = PaisaField(default=0)
+    total_loaded = PaisaField(default=0)
+    # Users are on the default database and vouchers may be on another shard
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_vouchers', db_constraint=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
@@ -17,22 +74,218 @@ class Voucher(models.Model):
     disabled_at = models.DateTimeField(null=True, blank=True)
     is_sold = models.BooleanField(default=False)
     sold_at = models.DateTimeField(null=True, blank=True)
+    balance_shards = models.PositiveSmallIntegerField(
+        default=0,
+        help_text='Number of VoucherBalanceShard rows holding the balance; 0 keeps it in current_balance.'
+    )
     
     def save(self, *args, **kwargs):
-        """Override save to generate unique code if not provided."""
+        """
+        Override save to generate unique code if not provided. New vouchers are
+        always written to their creator's shard, whatever database was asked for.
+        """
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        kwargs['using'] = shard_for_creator(self.creator_id)
         if not self.code:
-            self.code = str(uuid.uuid4())[:8].upper()
-        super().save(*args, **kwargs)
+            self.code = new_voucher_code(kwargs['using'])
+        with transaction.atomic(using=kwargs['using']):
+            super().save(*args, **kwargs)
+            OutboxEvent.record('voucher.created', self)
+
+    objects = VoucherQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Newest-first listing and created_at ranges, overall and per creator
+            models.Index(fields=['created_at'], name='voucher_created_idx'),
+            models.Index(fields=['creator', 'created_at'], name='voucher_creator_created_idx'),
+            models.Index(fields=['current_balance'], name='voucher_balance_idx'),
+            models.Index(fields=['sold_at'], name='voucher_sold_at_idx'),
+            # Sold and disabled vouchers are the minority; list them without scanning active ones
+            models.Index(fields=['created_at'], condition=Q(is_disabled=True), name='voucher_disabled_idx'),
+            models.Index(
+                fields=['created_at'], condition=Q(is_sold=True, is_disabled=False), name='voucher_sold_idx'
+            ),
+            models.Index(fields=['balance_shards'], condition=Q(balance_shards__gt=0), name='voucher_sharded_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=Q(current_balance__gte=0), name='voucher_balance_not_negative'),
+        ]
 
     def __str__(self):
-        return f"Voucher {self.code} - Balance: Rs {self.current_balance}"
+        return f"Voucher {self.code} - Balance: Rs {format_rupees(self.balance)}"
+
+    @property
+    def balance(self):
+        """Spendable balance in paisa: current_balance plus any sharded sub-balances."""
+        if not self.balance_shards:
+            return self.current_balance
+        if not hasattr(self, '_shard_total'):
+            self._shard_total = self.shards.aggregate(total=Sum('balance'))['total'] or 0
+        return self.current_balance + self._shard_total
+
+    def refresh_balance(self):
+        """Reload the stored balance after it was changed by a conditional UPDATE."""
+        self.refresh_from_db(fields=['current_balance', 'total_loaded', 'balance_shards'])
+        self.__dict__.pop('_shard_total', None)
 
     def can_afford(self, amount):
-        """Check if voucher has sufficient balance for a transaction."""
-        return self.current_balance >= amount
+        """Check if voucher has sufficient balance for a transaction of amount paisa."""
+        return self.balance >= amount
+
+    def apply_transaction(self, transaction_type, amount):
+        """
+        Apply a ledger entry to the stored balance with conditional UPDATEs rather
+        than a read-modify-write, so concurrent payments can neither lose updates
+        nor overdraw the voucher. Raises InsufficientBalance if a debit does not fit.
+        """
+        if transaction_type in ('payment', 'hold'):
+            sharded = self.balance_shards
+            if sharded:
+                debited = VoucherBalanceShard.debit(self, amount)
+            else:
+                debited = Voucher.objects.using(self._state.db).filter(
+                    pk=self.pk, balance_shards=0, current_balance__gte=amount
+                ).update(current_balance=F('current_balance') - amount, updated_at=timezone.now())
+            if not debited:
+                self.refresh_balance()
+                if self.balance_shards != sharded:
+                    # Sharding was switched on or off since this instance was loaded
+                    return self.apply_transaction(transaction_type, amount)
+                raise InsufficientBalance(
+                    f"Insufficient balance. Available: Rs {format_rupees(self.balance)}, "
+                    f"Required: Rs {format_rupees(amount)}"
+                )
+        else:
+            changes = {'updated_at': timezone.now()}
+            if transaction_type == 'recharge':
+                changes['total_loaded'] = F('total_loaded') + amount
+            if self.balance_shards:
+                credited = VoucherBalanceShard.credit(self, amount) and Voucher.objects.using(
+                    self._state.db
+                ).filter(pk=self.pk).update(**changes)
+            else:
+                credited = Voucher.objects.using(self._state.db).filter(pk=self.pk, balance_shards=0).update(
+                    current_balance=F('current_balance') + amount, **changes
+                )
+            if not credited:
+                # Sharding was switched on, off or resized since this instance was loaded
+                self.refresh_balance()
+                return self.apply_transaction(transaction_type, amount)
+        self.refresh_balance()
+
+    def set_balance_shards(self, count):
+        """
+        Spread the balance evenly over count shard rows, or move it back into
+        current_balance when count is 0. Hot vouchers with many concurrent
+        payments use shards so debits do not all contend on the voucher row.
+        """
+        db = self._state.db
+        with transaction.atomic(using=db):
+            locked = Voucher.objects.using(db).select_for_update().get(pk=self.pk)
+            shards = list(VoucherBalanceShard.objects.using(db).select_for_update().filter(voucher=locked))
+            total = locked.current_balance + sum(shard.balance for shard in shards)
+            VoucherBalanceShard.objects.using(db).filter(voucher=locked).delete()
+            if count:
+                VoucherBalanceShard.objects.using(db).bulk_create(
+                    VoucherBalanceShard(voucher=locked, index=index, balance=balance)
+                    for index, balance in enumerate(VoucherBalanceShard.split(total, count))
+                )
+            Voucher.objects.using(db).filter(pk=self.pk).update(
+                current_balance=0 if count else total, balance_shards=count, updated_at=timezone.now()
+            )
+        self.refresh_balance()
+
+    def release_expired_holds(self):
+        """Return the balance of any overdue holds on this voucher. Returns the number released."""
+        released = 0
+        for hold in self.holds.filter(status='active', expires_at__lte=timezone.now()):
+            released += hold.expire()
+        if released:
+            self.refresh_balance()
+        return released
+
+
+class VoucherBalanceShard(models.Model):
+    """
+    One slice of a sharded voucher's balance.
+
+    Debits take the amount from a random shard that can cover it and is not
+    locked by another payment, in a single UPDATE, so concurrent payments on one
+    voucher touch different rows. Only when no single shard can cover a debit
+    are all shards locked, evened out and the debit taken from the combined
+    total.
+    """
+    voucher = models.ForeignKey(Voucher, on_delete=models.CASCADE, related_name='shards')
+    index = models.PositiveSmallIntegerField()
+    balance = PaisaField(default=0)
+
+    class Meta:
+        ordering = ['voucher', 'index']
+        constraints = [
+            models.UniqueConstraint(fields=['voucher', 'index'], name='unique_balance_shard_per_voucher'),
+            models.CheckConstraint(check=Q(balance__gte=0), name='balance_shard_not_negative'),
+        ]
+
+    def __str__(self):
+        return f"Shard {self.index} of voucher {self.voucher_id}: Rs {format_rupees(self.balance)}"
+
+    @staticmethod
+    def split(total, count):
+        """Divide total paisa into count near-equal parts."""
+        share, extra = divmod(total, count)
+        return [share + (1 if index < extra else 0) for index in range(count)]
+
+    @classmethod
+    def debit(cls, voucher, amount):
+        """Take amount from one of the voucher's shards. Returns False if the shards together cannot cover it."""
+        db = voucher._state.db
+        shards = cls.objects.using(db).filter(voucher_id=voucher.pk)
+        covering = shards.filter(balance__gte=amount).order_by('?')
+        if shards.filter(pk=Subquery(covering.select_for_update(skip_locked=True).values('pk')[:1])).update(
+            balance=F('balance') - amount
+        ):
+            return True
+        # Every shard that can cover the debit is held by a concurrent payment, so
+        # wait for one. A shard drained while waiting stays locked until the
+        # savepoint is rolled back, which must happen before a rebalance locks
+        # all shards or two rebalances could deadlock.
+        savepoint = transaction.savepoint(using=db)
+        if shards.filter(pk=Subquery(covering.select_for_update().values('pk')[:1])).update(
+            balance=F('balance') - amount
+        ):
+            transaction.savepoint_commit(savepoint, using=db)
+            return True
+        transaction.savepoint_rollback(savepoint, using=db)
+        return cls.rebalance(voucher, debit=amount)
+
+    @classmethod
+    def credit(cls, voucher, amount):
+        """
+        Add amount to a random shard. Returns False, crediting nothing, if that
+        shard no longer exists because voucher.balance_shards is out of date.
+        """
+        index = random.randrange(voucher.balance_shards)
+        return bool(cls.objects.using(voucher._state.db).filter(voucher_id=voucher.pk, index=index).update(
+            balance=F('balance') + amount
+        ))
+
+    @classmethod
+    def rebalance(cls, voucher, debit=0):
+        """Even out the voucher's shards after taking debit from their total. Returns False if the total is short."""
+        db = voucher._state.db
+        with transaction.atomic(using=db):
+            shards = list(cls.objects.using(db).select_for_update().filter(voucher_id=voucher.pk).order_by('index'))
+            total = sum(shard.balance for shard in shards)
+            if not shards or total < debit:
+                return False
+            for shard, balance in zip(shards, cls.split(total - debit, len(shards))):
+                shard.balance = balance
+            cls.objects.using(db).bulk_update(shards, ['balance'])
+        return True
 
 
 class Transaction(models.Model):
@@ -40,29 +293,412 @@ class Transaction(models.Model):
     TRANSACTION_TYPES = [
         ('recharge', 'Recharge'),
         ('payment', 'Payment'),
+        ('hold', 'Hold'),
+        ('release', 'Hold Release'),
     ]
 
     voucher = models.ForeignKey(Voucher, on_delete=models.CASCADE, related_name='transactions')
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = PaisaField()
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
     description = models.CharField(max_length=255, blank=True)
+    reference = models.CharField(max_length=64, unique=True, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Newest-first admin listing, its date hierarchy and the type filter
+            models.Index(fields=['created_at'], name='transaction_created_idx'),
+            models.Index(fields=['transaction_type', 'created_at'], name='transaction_type_created_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.transaction_type.title()} of Rs {self.amount} for voucher {self.voucher.code}"
+        return f"{self.transaction_type.title()} of Rs {format_rupees(self.amount)} for voucher {self.voucher.code}"
 
     def save(self, *args, **kwargs):
-        """Override save to update voucher balance."""
+        """
+        Override save to apply a new transaction to the voucher balance, the daily
+        usage rollup and the event outbox. Raises InsufficientBalance, leaving
+        nothing written, if a debit no longer fits the balance. New transactions
+        are always written to their voucher's shard.
+        """
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        kwargs['using'] = self.voucher._state.db
+        with transaction.atomic(using=kwargs['using']):
+            self.voucher.apply_transaction(self.transaction_type, self.amount)
+            super().save(*args, **kwargs)
+            DailyUsage.record(self)
+            OutboxEvent.record_transaction(self)
+
+
+class VoucherHold(models.Model):
+    """
+    A lease on part of a voucher's balance.
+
+    Placing a hold debits the voucher immediately with a 'hold' transaction, so the
+    client can consume the amount locally without further round trips. Settling
+    releases the hold and records a single payment for the amount actually used;
+    holds that are not settled before expires_at are released in full.
+    """
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('settled', 'Settled'),
+        ('expired', 'Expired'),
+    ]
+
+    key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    voucher = models.ForeignKey(Voucher, on_delete=models.CASCADE, related_name='holds')
+    amount = PaisaField()
+    amount_used = PaisaField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    settled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='hold_status_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"Hold of Rs {format_rupees(self.amount)} on voucher {self.voucher.code} ({self.status})"
+
+    @property
+    def is_expired(self):
+        return self.status == 'expired' or (self.status == 'active' and self.expires_at <= timezone.now())
+
+    @classmethod
+    def place(cls, voucher, amount, ttl_seconds):
+        """Reserve amount from the voucher's balance. Caller validates the amount first."""
+        db = voucher._state.db
+        with transaction.atomic(using=db):
+            hold = cls.objects.using(db).create(
+                key=new_hold_key(db),
+                voucher=voucher,
+                amount=amount,
+                expires_at=timezone.now() + timedelta(seconds=ttl_seconds),
+            )
+            Transaction.objects.create(
+                voucher=voucher,
+                amount=amount,
+                transaction_type='hold',
+                description=f'Hold of Rs {format_rupees(amount)} ({hold.key})'
+            )
+        return hold
+
+    def settle(self, amount_used):
+        """
+        Release the hold and charge amount_used as a payment.
+        Returns False if the hold was already settled or expired.
+        """
+        if not 0 <= amount_used <= self.amount:
+            raise ValueError(f'amount_used must be between 0 and the held Rs {format_rupees(self.amount)}')
+        with transaction.atomic(using=self._state.db):
+            if not self._close('settled', amount_used):
+                return False
+            Transaction.objects.create(
+                voucher=self.voucher,
+                amount=self.amount,
+                transaction_type='release',
+                description=f'Release of hold {self.key}'
+            )
+            if amount_used > 0:
+                Transaction.objects.create(
+                    voucher=self.voucher,
+                    amount=amount_used,
+                    transaction_type='payment',
+                    description=f'Payment of Rs {format_rupees(amount_used)} (hold {self.key})'
+                )
+        return True
+
+    def expire(self):
+        """Return the full held amount to the voucher. Returns 1 if released, 0 otherwise."""
+        with transaction.atomic(using=self._state.db):
+            if not self._close('expired', None):
+                return 0
+            Transaction.objects.create(
+                voucher=self.voucher,
+                amount=self.amount,
+                transaction_type='release',
+                description=f'Expiry of hold {self.key}'
+            )
+        return 1
+
+    def _close(self, new_status, amount_used):
+        """Move an active hold to a final state. Only one concurrent caller can succeed."""
+        now = timezone.now()
+        closed = VoucherHold.objects.using(self._state.db).filter(pk=self.pk, status='active').update(
+            status=new_status, amount_used=amount_used, settled_at=now
+        )
+        if closed:
+            self.status, self.amount_used, self.settled_at = new_status, amount_used, now
+        return bool(closed)
+
+
+class DailyUsage(models.Model):
+    """
+    Pre-aggregated transaction totals per creator, day and transaction type.
+
+    Rows are maintained incrementally by Transaction.save() and can be rebuilt
+    from the ledger with the backfill_daily_usage management command.
+
+    Transactions on a sharded voucher add to one of several slot rows for the
+    same creator, day and type, so concurrent payments to a hot voucher do not
+    all update one rollup row. Readers sum over the slots.
+    """
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_usage', db_constraint=False)
+    day = models.DateField()
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    slot = models.PositiveSmallIntegerField(default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+    total_amount = PaisaField(default=0)
+
+    class Meta:
+        ordering = ['day', 'transaction_type']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['creator', 'day', 'transaction_type', 'slot'],
+                name='unique_daily_usage_per_creator_day_type_slot',
+            ),
+        ]
+        indexes = [
+            # Serves range queries across all creators (superadmin view)
+            models.Index(fields=['day', 'transaction_type'], name='daily_usage_day_type_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.transaction_type} x{self.transaction_count}: Rs {format_rupees(self.total_amount)}"
+
+    @classmethod
+    def record(cls, txn):
+        """Add a single transaction to its rollup row."""
+        shards = txn.voucher.balance_shards
+        key = {
+            'creator_id': txn.voucher.creator_id,
+            'day': timezone.localdate(txn.created_at),
+            'transaction_type': txn.transaction_type,
+            'slot': random.randrange(shards) if shards else 0,
+        }
+        increment = {
+            'transaction_count': F('transaction_count') + 1,
+            'total_amount': F('total_amount') + txn.amount,
+        }
+        rollups = cls.objects.using(txn._state.db)
+        if rollups.filter(**key).update(**increment):
+            return
+        try:
+            with transaction.atomic(using=txn._state.db):
+                rollups.create(transaction_count=1, total_amount=txn.amount, **key)
+        except IntegrityError:
+            # Another writer created the row first
+            rollups.filter(**key).update(**increment)
+
+
+class WebhookEndpoint(models.Model):
+    """URL that receives a creator's outbox events as signed, batched webhooks."""
+    creator = models.OneToOneField(User, on_delete=models.CASCADE, related_name='webhook_endpoint')
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        """Override save to generate a signing secret if not provided."""
+        if not self.secret:
+            self.secret = secrets.token_hex(32)
         super().save(*args, **kwargs)
-        
-        # Update voucher balance based on transaction type
-        if self.transaction_type == 'recharge':
-            self.voucher.current_balance += self.amount
-            self.voucher.total_loaded += self.amount
-        elif self.transaction_type == 'payment':
-            self.voucher.current_balance -= self.amount
-        
-        self.voucher.save()
+
+    def __str__(self):
+        return f"Webhook for {self.creator.username}: {self.url}"
+
+
+class OutboxEvent(models.Model):
+    """
+    Voucher state change waiting to be delivered as a webhook.
+
+    Events are written in the same DB transaction as the change they describe, so
+    an event exists if and only if the change was committed. The deliver_webhooks
+    command sends them to the creator's WebhookEndpoint.
+    """
+    EVENT_TYPES = [
+        ('voucher.created', 'Voucher Created'),
+        ('transaction.created', 'Transaction Created'),
+        ('voucher.low_balance', 'Voucher Low Balance'),
+        ('voucher.disabled', 'Voucher Disabled'),
+        ('voucher.enabled', 'Voucher Enabled'),
+        ('voucher.sold', 'Voucher Sold'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('delivered', 'Delivered'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    ]
+
+    event_type = models.CharField(max_length=30, choices=EVENT_TYPES)
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='outbox_events', db_constraint=False)
+    voucher = models.ForeignKey(Voucher, on_delete=models.CASCADE, null=True, blank=True, related_name='events')
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    # Due time while pending; end of the delivering worker's claim while sending
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx'),
+            # Serves event stream catch-up for one creator
+            models.Index(fields=['creator', 'id'], name='outbox_creator_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} for voucher {self.payload.get('voucher', {}).get('code')} ({self.status})"
+
+    @staticmethod
+    def voucher_snapshot(voucher):
+        return {
+            'id': voucher.id,
+            'code': voucher.code,
+            'current_balance': format_rupees(voucher.balance),
+            'total_loaded': format_rupees(voucher.total_loaded),
+            'is_disabled': voucher.is_disabled,
+            'is_sold': voucher.is_sold,
+            'creator_id': voucher.creator_id,
+            'created_at': voucher.created_at,
+        }
+
+    @classmethod
+    def record(cls, event_type, voucher, **data):
+        """Add an event for voucher to the outbox. Call inside the transaction that made the change."""
+        return cls.objects.using(voucher._state.db).create(
+            event_type=event_type,
+            creator_id=voucher.creator_id,
+            voucher=voucher,
+            payload={'voucher': cls.voucher_snapshot(voucher), **data},
+        )
+
+    @classmethod
+    def record_transaction(cls, txn):
+        """Add the events caused by a new transaction, including a low-balance warning when it crosses the threshold."""
+        voucher = txn.voucher
+        sign = -1 if txn.transaction_type in ('payment', 'hold') else 1
+        previous_balance = voucher.balance - sign * txn.amount
+        cls.record('transaction.created', voucher, transaction={
+            'id': txn.id,
+            'amount': format_rupees(txn.amount),
+            'transaction_type': txn.transaction_type,
+            'description': txn.description,
+            'reference': txn.reference,
+            'created_at': txn.created_at,
+        })
+
+        threshold = settings.VOUCHER_LOW_BALANCE_THRESHOLD
+        if previous_balance >= to_paisa(threshold) > voucher.balance:
+            cls.record('voucher.low_balance', voucher, threshold=threshold)
+
+
+class Job(models.Model):
+    """
+    Long-running bulk operation processed by the run_jobs worker.
+
+    Work is done in chunks. Each chunk commits in one DB transaction together
+    with the job's cursor and progress, so a job interrupted by a crash or a
+    restart resumes from its last committed chunk without repeating work.
+    """
+    KIND_CHOICES = [
+        ('bulk_create', 'Bulk Voucher Creation'),
+        ('import', 'Voucher Import'),
+        ('export', 'Voucher Export'),
+        ('reconcile', 'Balance Reconciliation'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs')
+    params = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    cursor = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    result = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    processed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Serves the worker's queue scan and stale-job check
+            models.Index(fields=['status', 'id'], name='job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} job {self.id} ({self.status})"
+
+    @property
+    def progress(self):
+        """Percentage of committed work, or None before the total is known."""
+        if self.total is None:
+            return None
+        if self.total == 0:
+            return 100.0
+        return round(100 * self.processed / self.total, 1)
+
+
+class CreatorShard(models.Model):
+    """Database alias holding a creator's vouchers (see vouchers.sharding)."""
+    creator = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='voucher_shard')
+    alias = models.CharField(max_length=50)
+
+    def __str__(self):
+        return f"{self.creator_id} -> {self.alias}"
+
+
+class RequestProfile(models.Model):
+    """Stack samples and SQL of one profiled request (see vouchers.profiling)."""
+    TRIGGER_CHOICES = [
+        ('header', 'X-Profile header'),
+        ('sample', 'Random sample'),
+    ]
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view = models.CharField(max_length=200)
+    status_code = models.PositiveSmallIntegerField()
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='request_profiles')
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    duration_ms = models.FloatField()
+    sample_count = models.PositiveIntegerField()
+    query_count = models.PositiveIntegerField()
+    sql_ms = models.FloatField()
+    # Collapsed stacks: one "frame;frame;frame count" line per distinct stack
+    stacks = models.TextField(blank=True)
+    queries = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,43 @@
+"""
+Money is stored and computed as integer paisa (1 Rs = 100 paisa).
+
+Amounts only become rupees at the edges: parsing request input and
+formatting responses, messages and event payloads.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import models
+
+PAISA_PER_RUPEE = 100
+
+
+class PaisaField(models.BigIntegerField):
+    """An amount of money in paisa."""
+    description = 'Amount of money in paisa'
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('help_text', 'Amount in paisa (1 Rs = 100 paisa)')
+        super().__init__(*args, **kwargs)
+
+
+def to_paisa(value):
+    """Convert a rupee amount (str, int or Decimal with at most 2 decimal places) to paisa."""
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f'Invalid amount: {value!r}')
+    if not amount.is_finite() or amount.as_tuple().exponent < -2:
+        raise ValueError(f'Invalid amount: {value!r}')
+    return int(amount * PAISA_PER_RUPEE)
+
+
+def format_rupees(paisa):
+    """Format paisa as a rupee string with two decimal places, e.g. 15050 -> '150.50'."""
+    sign = '-' if paisa < 0 else ''
+    rupees, remainder = divmod(abs(paisa), PAISA_PER_RUPEE)
+    return f'{sign}{rupees}.{remainder:02d}'
+
+
+def as_rupees(paisa):
+    """Paisa as a JSON number of rupees, e.g. 15050 -> 150.5."""
+    return paisa / PAISA_PER_RUPEE
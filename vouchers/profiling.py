@@ -0,0 +1,234 @@
+"""
+On-demand request profiling.
+
+RequestProfilerMiddleware profiles a request when a superuser sends the
+X-Profile: 1 header, or at random for PROFILE_SAMPLE_RATE of all requests.
+While the view runs, a timer thread samples the view's Python stack every
+PROFILE_INTERVAL seconds and every SQL statement is timed on all database
+connections. The result is stored as a RequestProfile, of which only the
+newest PROFILE_RETENTION are kept, and its id returned in X-Profile-Id.
+
+Stacks are kept in the collapsed format ("frame;frame;frame count" per
+line) that flamegraph.pl, speedscope and inferno read directly. Sampling
+only reads the stack from another thread, so a profiled request runs at
+close to its normal speed, unlike with cProfile.
+"""
+import asyncio
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+
+def frame_name(frame):
+    """Frame label for collapsed stacks, e.g. vouchers.views:recharge_voucher."""
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def view_name(view_func):
+    """Dotted name of a view function, or of the view class behind as_view() and @api_view."""
+    view = getattr(view_func, 'view_class', view_func)
+    return f'{view.__module__}.{view.__name__}'
+
+
+class StackSampler:
+    """
+    Counts the collapsed stacks of one thread, sampled from a timer thread.
+    Only frames called from a running root_code are counted.
+    """
+
+    def __init__(self, thread_id, root_code, interval):
+        self.thread_id = thread_id
+        self.root_code = root_code
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None and frame.f_code is not self.root_code:
+                names.append(frame_name(frame))
+                frame = frame.f_back
+            if frame is not None and names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class QueryRecorder:
+    """execute_wrapper timing every statement; keeps the first PROFILE_MAX_QUERIES of them."""
+
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+        self.total_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.total_ms += ms
+            if len(self.queries) < settings.PROFILE_MAX_QUERIES:
+                self.queries.append({
+                    'database': context['connection'].alias,
+                    'sql': sql,
+                    'many': many,
+                    'ms': round(ms, 3),
+                })
+
+
+def _superuser(request):
+    """The session or token user of request if they are a superuser, otherwise None."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user if user.is_superuser else None
+
+    key = request.headers.get('Authorization', '').removeprefix('Token ').strip()
+    if not key:
+        return None
+    try:
+        user, _ = TokenAuthentication().authenticate_credentials(key)
+    except AuthenticationFailed:
+        return None
+    return user if user.is_superuser else None
+
+
+def profile_trigger(request):
+    """
+    'header' or 'sample' if the request asks to be profiled or is drawn for it,
+    otherwise None. Needs no database, so it is cheap enough for every request;
+    profile_view() checks that header requests come from a superuser.
+    """
+    if request.headers.get(PROFILE_HEADER) == '1':
+        return 'header'
+    if settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE:
+        return 'sample'
+    return None
+
+
+def _trim_to_retention():
+    """Delete all but the newest PROFILE_RETENTION profiles."""
+    oldest_kept = list(
+        RequestProfile.objects.order_by('-id').values_list('id', flat=True)[
+            settings.PROFILE_RETENTION - 1:settings.PROFILE_RETENTION
+        ]
+    )
+    if oldest_kept:
+        RequestProfile.objects.filter(id__lt=oldest_kept[0]).delete()
+
+
+def _call_view(view_func, request, view_args, view_kwargs):
+    """The root frame of every sampled stack."""
+    response = view_func(request, *view_args, **view_kwargs)
+    # DRF and template responses do their rendering work here
+    if hasattr(response, 'render') and callable(response.render):
+        response = response.render()
+    return response
+
+
+def profile_view(request, view_func, view_args, view_kwargs, trigger):
+    """
+    Call the view under the stack sampler and query recorder and store the
+    profile. Returns None, leaving the view to run as usual, for header
+    requests from anyone but a superuser.
+    """
+    if trigger == 'header' and _superuser(request) is None:
+        return None
+    sampler = StackSampler(threading.get_ident(), _call_view.__code__, settings.PROFILE_INTERVAL)
+    recorder = QueryRecorder()
+    started = time.perf_counter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        sampler.start()
+        stack.callback(sampler.stop)
+        response = _call_view(view_func, request, view_args, view_kwargs)
+    duration_ms = (time.perf_counter() - started) * 1000
+
+    # DRF authenticates inside the view, so the user is only known now
+    user = getattr(request, 'user', None)
+    try:
+        profile = RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:500],
+            view=view_name(view_func)[:200],
+            status_code=response.status_code,
+            user=user if user is not None and user.is_authenticated else None,
+            trigger=trigger,
+            duration_ms=round(duration_ms, 3),
+            sample_count=sum(sampler.stacks.values()),
+            query_count=recorder.count,
+            sql_ms=round(recorder.total_ms, 3),
+            stacks=sampler.collapsed(),
+            queries=recorder.queries,
+        )
+        _trim_to_retention()
+    except DatabaseError:
+        # Never fail a request that already ran because its profile could not be stored
+        logger.exception('Could not store the profile of %s %s', request.method, request.path)
+        return response
+
+    response[PROFILE_ID_HEADER] = str(profile.id)
+    return response
+
+
+class RequestProfilerMiddleware(MiddlewareMixin):
+    """
+    Runs profiled requests' views itself, under profile_view(). Other requests
+    pass through untouched. It must come last in MIDDLEWARE so the profile
+    covers only the view.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if asyncio.iscoroutinefunction(get_response):
+            # Under ASGI, let requests that are not profiled pass without a hop to a thread
+            self.process_view = self._aprocess_view
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Async views (the event stream) are not tied to one thread and cannot be sampled
+        trigger = None if asyncio.iscoroutinefunction(view_func) else profile_trigger(request)
+        if trigger is None:
+            return None
+        return profile_view(request, view_func, view_args, view_kwargs, trigger)
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        trigger = None if asyncio.iscoroutinefunction(view_func) else profile_trigger(request)
+        if trigger is None:
+            return None
+        # The thread Django runs sync views in, so the view keeps its database connections
+        return await sync_to_async(profile_view, thread_sensitive=True)(
+            request, view_func, view_args, view_kwargs, trigger
+        )
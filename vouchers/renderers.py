@@ -0,0 +1,58 @@
+"""
+JSON encoding backed by orjson when it is installed.
+
+Output matches rest_framework's JSONRenderer byte for byte in its default
+compact, unicode mode: anything orjson does not handle natively the same way
+(datetimes, decimals, lazy strings) is handed to DRF's own JSONEncoder.
+Without orjson the stdlib json module is used with JSONRenderer's settings.
+"""
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_encoder = JSONEncoder()
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def _strict_constant(value):
+    raise ValueError(f'Out of range float values are not JSON compliant: {value}')
+
+
+def dumps(data):
+    """Encode data as compact UTF-8 JSON bytes, exactly as JSONRenderer would."""
+    if orjson is not None:
+        ret = orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS)
+    else:
+        ret = json.dumps(
+            data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':')
+        ).encode()
+    # Keep the output a strict JavaScript subset, as JSONRenderer does
+    if b'\xe2\x80' in ret:
+        ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+    return ret
+
+
+def loads(body):
+    """Decode a JSON request body, rejecting NaN and Infinity like JSONParser. Raises ValueError."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body, parse_constant=_strict_constant)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer using dumps() for the common compact case."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not self.compact or self.ensure_ascii or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
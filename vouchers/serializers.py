@@ -1,6 +1,50 @@
+from decimal import Decimal, InvalidOperation
 from rest_framework import serializers
+from django.conf import settings
+from django.db import transaction
 from django.contrib.auth.models import User
-from .models import Voucher, Transaction
+from .models import Voucher, Transaction, VoucherHold, WebhookEndpoint, Job, RequestProfile
+from .money import PAISA_PER_RUPEE, format_rupees, to_paisa
+from .sharding import CODE_PREFIXES, code_prefix, shard_for_code, shard_for_creator
+from .webhooks import UnsafeWebhookURL, check_url
+
+
+class MoneyField(serializers.Field):
+    """
+    Amount held as integer paisa and exchanged as a rupee string, e.g. 15050 <-> "150.50".
+    Accepts the same input as a DecimalField with 2 decimal places.
+    """
+    default_error_messages = {
+        'invalid': 'A valid number is required.',
+        'max_digits': 'Ensure that there are no more than {max_digits} digits in total.',
+        'max_decimal_places': 'Ensure that there are no more than 2 decimal places.',
+        'min_value': 'Ensure this value is greater than or equal to {min_value}.',
+    }
+
+    def __init__(self, max_digits=10, min_value=None, **kwargs):
+        self.max_digits = max_digits
+        self.min_value = min_value
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            value = Decimal(str(data).strip())
+        except InvalidOperation:
+            self.fail('invalid')
+        if not value.is_finite():
+            self.fail('invalid')
+        if value.as_tuple().exponent < -2:
+            self.fail('max_decimal_places')
+
+        paisa = int(value * PAISA_PER_RUPEE)
+        if abs(paisa) >= 10 ** self.max_digits:
+            self.fail('max_digits', max_digits=self.max_digits)
+        if self.min_value is not None and paisa < to_paisa(self.min_value):
+            self.fail('min_value', min_value=self.min_value)
+        return paisa
+
+    def to_representation(self, value):
+        return format_rupees(value)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -14,22 +58,25 @@ class UserSerializer(serializers.ModelSerializer):
 
 class TransactionSerializer(serializers.ModelSerializer):
     """Serializer for Transaction model."""
+    amount = MoneyField()
     
     class Meta:
         model = Transaction
-        fields = ['id', 'amount', 'transaction_type', 'description', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'amount', 'transaction_type', 'description', 'reference', 'created_at']
+        read_only_fields = ['id', 'reference', 'created_at']
 
 
 class VoucherSerializer(serializers.ModelSerializer):
     """Serializer for Voucher model."""
+    current_balance = MoneyField(source='balance', read_only=True)
+    total_loaded = MoneyField(required=False)
     creator = UserSerializer(read_only=True)
     transactions = TransactionSerializer(many=True, read_only=True)
     
     class Meta:
         model = Voucher
-        fields = ['id', 'code', 'current_balance', 'total_loaded', 'creator', 'created_at', 'updated_at', 'transactions']
-        read_only_fields = ['id', 'code', 'creator', 'created_at', 'updated_at']
+        fields = ['id', 'code', 'current_balance', 'total_loaded', 'balance_shards', 'creator', 'created_at', 'updated_at', 'transactions']
+        read_only_fields = ['id', 'code', 'balance_shards', 'creator', 'created_at', 'updated_at']
 
     def create(self, validated_data):
         """Create a new voucher with the authenticated user as creator."""
@@ -39,7 +86,7 @@ class VoucherSerializer(serializers.ModelSerializer):
 
 class VoucherCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating vouchers with initial value."""
-    initial_value = serializers.DecimalField(max_digits=10, decimal_places=2, write_only=True)
+    initial_value = MoneyField(min_value='0.01', write_only=True)
     
     class Meta:
         model = Voucher
@@ -48,19 +95,22 @@ class VoucherCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """Create voucher with initial balance."""
         initial_value = validated_data.pop('initial_value')
-        voucher = Voucher.objects.create(
-            creator=self.context['request'].user,
-            current_balance=0,  # Start with 0 balance
-            total_loaded=0  # Start with 0 total loaded
-        )
-        
-        # Create initial recharge transaction
-        Transaction.objects.create(
-            voucher=voucher,
-            amount=initial_value,
-            transaction_type='recharge',
-            description=f'Initial voucher creation with Rs {initial_value}'
-        )
+        creator = self.context['request'].user
+        # The voucher and its initial recharge are committed together or not at all
+        with transaction.atomic(using=shard_for_creator(creator.id)):
+            voucher = Voucher.objects.create(
+                creator=creator,
+                current_balance=0,  # Start with 0 balance
+                total_loaded=0  # Start with 0 total loaded
+            )
+            
+            # Create initial recharge transaction
+            Transaction.objects.create(
+                voucher=voucher,
+                amount=initial_value,
+                transaction_type='recharge',
+                description=f'Initial voucher creation with Rs {format_rupees(initial_value)}'
+            )
         
         return voucher
     
@@ -69,6 +119,44 @@ class VoucherCreateSerializer(serializers.ModelSerializer):
         return VoucherSerializer(instance).data
 
 
+class VoucherSearchSerializer(serializers.Serializer):
+    """Query parameters of the voucher search. All are optional and combine with AND."""
+    DATE_OR_DATETIME = ['iso-8601', '%Y-%m-%d']
+    STATUS_FILTERS = {
+        'active': {'is_disabled': False, 'is_sold': False},
+        'sold': {'is_disabled': False, 'is_sold': True},
+        'disabled': {'is_disabled': True},
+    }
+
+    code = serializers.CharField(max_length=20, required=False, allow_blank=True)
+    min_balance = MoneyField(min_value='0', required=False)
+    max_balance = MoneyField(min_value='0', required=False)
+    created_after = serializers.DateTimeField(input_formats=DATE_OR_DATETIME, required=False)
+    created_before = serializers.DateTimeField(input_formats=DATE_OR_DATETIME, required=False)
+    sold_after = serializers.DateTimeField(input_formats=DATE_OR_DATETIME, required=False)
+    sold_before = serializers.DateTimeField(input_formats=DATE_OR_DATETIME, required=False)
+    status = serializers.ChoiceField(choices=[*STATUS_FILTERS, 'all'], default='all')
+    creator = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        for low, high in [('min_balance', 'max_balance'), ('created_after', 'created_before'),
+                          ('sold_after', 'sold_before')]:
+            if low in data and high in data and data[low] > data[high]:
+                raise serializers.ValidationError({high: f"Must not be less than {low}."})
+        return data
+
+
+class VoucherSearchResultSerializer(VoucherSerializer):
+    """Serializer for voucher search results: status instead of the transaction history."""
+
+    class Meta(VoucherSerializer.Meta):
+        fields = [
+            'id', 'code', 'current_balance', 'total_loaded', 'balance_shards', 'creator', 'is_sold',
+            'is_disabled', 'created_at', 'sold_at', 'disabled_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
 class VoucherRechargeSerializer(serializers.Serializer):
     """Serializer for voucher recharge."""
     amount = serializers.ChoiceField(choices=[100, 200, 500])
@@ -80,34 +168,278 @@ class VoucherRechargeSerializer(serializers.Serializer):
         return value
 
 
+class VoucherShardsSerializer(serializers.Serializer):
+    """Serializer for switching a voucher's sharded balance mode."""
+    shards = serializers.IntegerField(min_value=0, max_value=settings.VOUCHER_MAX_BALANCE_SHARDS)
+
+    def validate_shards(self, value):
+        """A single shard would only move the contention to another row."""
+        if value == 1:
+            raise serializers.ValidationError("Use 0 to turn sharding off or at least 2 shards.")
+        return value
+
+
+def payment_voucher(code):
+    """Voucher a payment is drawn from. Raises ValidationError for unknown codes."""
+    try:
+        return Voucher.objects.using(shard_for_code(code)).get(code=code)
+    except Voucher.DoesNotExist:
+        raise serializers.ValidationError("Invalid voucher code")
+
+
+def check_payment(voucher, amount):
+    """Raise ValidationError unless voucher can currently pay amount paisa."""
+    # Check if voucher is disabled or sold
+    if voucher.is_disabled or voucher.is_sold:
+        raise serializers.ValidationError(
+            "Voucher is disabled or sold and cannot be used for payments."
+        )
+
+    if not voucher.can_afford(amount):
+        # Overdue holds may still be tying up part of the balance
+        voucher.release_expired_holds()
+
+    if not voucher.can_afford(amount):
+        raise serializers.ValidationError(
+            f"Insufficient balance. Available: Rs {format_rupees(voucher.balance)}, "
+            f"Required: Rs {format_rupees(amount)}"
+        )
+
+
 class PaymentSerializer(serializers.Serializer):
     """Serializer for public payment endpoint."""
     voucher_code = serializers.CharField(max_length=20)
-    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0.01)
+    amount = MoneyField(min_value='0.01')
+    reference = serializers.CharField(max_length=64, required=False, allow_blank=True)
     
     def validate_voucher_code(self, value):
         """Validate that voucher exists and is active."""
-        try:
-            voucher = Voucher.objects.get(code=value)
-            self.context['voucher'] = voucher
-        except Voucher.DoesNotExist:
-            raise serializers.ValidationError("Invalid voucher code")
+        self.context['voucher'] = payment_voucher(value)
         return value
     
     def validate(self, data):
         """Validate payment amount against voucher balance and status."""
-        voucher = self.context.get('voucher')
-        amount = data['amount']
-        
-        # Check if voucher is disabled or sold
-        if voucher.is_disabled or voucher.is_sold:
+        check_payment(self.context.get('voucher'), data['amount'])
+        return data
+
+
+class PaymentBatchSerializer(serializers.Serializer):
+    """Serializer for submitting several payments in one request."""
+    payments = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.PAYMENT_BATCH_MAX_SIZE,
+    )
+
+
+class HoldCreateSerializer(PaymentSerializer):
+    """Serializer for reserving part of a voucher's balance as a hold."""
+    reference = None
+    ttl_seconds = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.VOUCHER_HOLD_MAX_TTL,
+        default=settings.VOUCHER_HOLD_DEFAULT_TTL,
+    )
+
+
+class HoldSettleSerializer(serializers.Serializer):
+    """Serializer for settling a hold with the amount actually used."""
+    amount_used = MoneyField(min_value='0')
+
+    def validate(self, data):
+        """Validate that the hold is still open and covers the amount used."""
+        hold = self.context['hold']
+
+        if hold.status == 'settled':
+            raise serializers.ValidationError("Hold has already been settled.")
+
+        if hold.is_expired:
             raise serializers.ValidationError(
-                "Voucher is disabled or sold and cannot be used for payments."
+                "Hold has expired and its balance was returned to the voucher."
             )
-        
-        if not voucher.can_afford(amount):
+
+        if data['amount_used'] > hold.amount:
             raise serializers.ValidationError(
-                f"Insufficient balance. Available: Rs {voucher.current_balance}, Required: Rs {amount}"
+                f"Amount used exceeds the hold. Held: Rs {format_rupees(hold.amount)}, "
+                f"Used: Rs {format_rupees(data['amount_used'])}"
             )
-        
+
         return data
+
+
+class VoucherHoldSerializer(serializers.ModelSerializer):
+    """Serializer for VoucherHold model."""
+    hold_id = serializers.UUIDField(source='key', read_only=True)
+    voucher_code = serializers.CharField(source='voucher.code', read_only=True)
+    amount = MoneyField(read_only=True)
+    amount_used = MoneyField(read_only=True, allow_null=True)
+    status = serializers.SerializerMethodField()
+
+    class Meta:
+        model = VoucherHold
+        fields = ['hold_id', 'voucher_code', 'amount', 'amount_used', 'status', 'expires_at', 'created_at', 'settled_at']
+        read_only_fields = fields
+
+    def get_status(self, obj):
+        """Report overdue holds as expired even before they are released."""
+        return 'expired' if obj.is_expired else obj.status
+
+
+class WebhookEndpointSerializer(serializers.ModelSerializer):
+    """Serializer for WebhookEndpoint model."""
+
+    class Meta:
+        model = WebhookEndpoint
+        fields = ['url', 'secret', 'is_active', 'created_at', 'updated_at']
+        read_only_fields = ['secret', 'created_at', 'updated_at']
+
+    def validate_url(self, value):
+        """Only https URLs whose host resolves to public addresses."""
+        try:
+            check_url(value)
+        except UnsafeWebhookURL as exc:
+            raise serializers.ValidationError(str(exc))
+        return value
+
+
+class VoucherImportRowSerializer(serializers.Serializer):
+    """
+    One row of a voucher import CSV. A blank code gets a generated one.
+    Expects the importing creator's id as context['creator_id'].
+    """
+    DUPLICATE_CODE = "A voucher with this code already exists."
+
+    code = serializers.CharField(max_length=20, required=False, allow_blank=True)
+    initial_value = MoneyField(min_value='0.01')
+
+    def validate_code(self, value):
+        """
+        The code must route to the creator's shard and be free there. Codes on
+        'default' may not start with any shard letter, including those of shards
+        not configured yet, so that adding shards never reroutes them.
+        """
+        if not value:
+            return value
+        alias = shard_for_creator(self.context['creator_id'])
+        prefix = code_prefix(alias)
+        if prefix and not value.startswith(prefix):
+            raise serializers.ValidationError(f"Codes for this account must start with {prefix}.")
+        if not prefix and value[0] in CODE_PREFIXES:
+            raise serializers.ValidationError(
+                f"Codes for this account must not start with {CODE_PREFIXES[0]} to {CODE_PREFIXES[-1]}."
+            )
+        if Voucher.objects.using(alias).filter(code=value).exists():
+            raise serializers.ValidationError(self.DUPLICATE_CODE)
+        return value
+
+    def create(self, validated_data):
+        initial_value = validated_data['initial_value']
+        voucher = Voucher.objects.create(
+            code=validated_data.get('code', ''),
+            creator_id=validated_data['creator_id']
+        )
+        Transaction.objects.create(
+            voucher=voucher,
+            amount=initial_value,
+            transaction_type='recharge',
+            description=f'Imported voucher with Rs {format_rupees(initial_value)}'
+        )
+        return voucher
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for background job status."""
+    progress = serializers.FloatField(read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'status', 'total', 'processed', 'progress', 'result', 'error',
+            'created_at', 'started_at', 'finished_at', 'download_url'
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.kind == 'export' and obj.status == 'completed':
+            return f'/api/jobs/{obj.id}/download/'
+        return None
+
+
+class JobCreateSerializer(serializers.Serializer):
+    """
+    Serializer for queueing a background job.
+    bulk_create needs initial_value and count, import needs a CSV file with an
+    initial_value column (and optionally code); export and reconcile take no options.
+    """
+    kind = serializers.ChoiceField(choices=Job.KIND_CHOICES)
+    initial_value = MoneyField(min_value='0.01', required=False)
+    count = serializers.IntegerField(min_value=1, max_value=settings.JOB_BULK_CREATE_MAX, required=False)
+    file = serializers.FileField(required=False)
+
+    REQUIRED_FIELDS = {
+        'bulk_create': ['initial_value', 'count'],
+        'import': ['file'],
+    }
+
+    def validate_file(self, value):
+        """Check the CSV header before the job is queued."""
+        header = value.readline().decode('utf-8-sig', errors='replace')
+        value.seek(0)
+        if 'initial_value' not in [column.strip() for column in header.split(',')]:
+            raise serializers.ValidationError("CSV must have a header row with an initial_value column.")
+        return value
+
+    def validate(self, data):
+        missing = {
+            field: "This field is required."
+            for field in self.REQUIRED_FIELDS.get(data['kind'], [])
+            if field not in data
+        }
+        if missing:
+            raise serializers.ValidationError(missing)
+        return data
+
+    def create(self, validated_data):
+        from .jobs import job_file_path
+
+        kind = validated_data['kind']
+        params = {}
+        if kind == 'bulk_create':
+            params = {'initial_value': validated_data['initial_value'], 'count': validated_data['count']}
+
+        with transaction.atomic():
+            job = Job.objects.create(kind=kind, creator=self.context['request'].user, params=params)
+            if kind == 'import':
+                path = job_file_path(job, 'import.csv')
+                with open(path, 'wb') as f:
+                    for chunk in validated_data['file'].chunks():
+                        f.write(chunk)
+                job.params = {'path': path}
+                job.save(update_fields=['params'])
+        return job
+
+
+class RequestProfileSerializer(serializers.ModelSerializer):
+    """Serializer for a stored request profile; the stacks are downloaded separately."""
+    user = serializers.CharField(source='user.username', read_only=True, default=None)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RequestProfile
+        fields = [
+            'id', 'method', 'path', 'view', 'status_code', 'user', 'trigger', 'duration_ms',
+            'sample_count', 'query_count', 'sql_ms', 'created_at', 'download_url'
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        return f'/api/profiles/{obj.id}/download/'
+
+
+class RequestProfileDetailSerializer(RequestProfileSerializer):
+    """Request profile with the SQL statements it ran."""
+
+    class Meta(RequestProfileSerializer.Meta):
+        fields = RequestProfileSerializer.Meta.fields + ['queries']
+        read_only_fields = fields
@@ -0,0 +1,244 @@
+"""
+Creator-based placement of voucher data across database aliases.
+
+Each creator's vouchers, and the balance shards, transactions, holds, usage
+rollups and outbox events that belong to them, live on one alias from
+VOUCHER_SHARDS. Users, tokens, jobs, webhook endpoints and the creator
+directory stay on 'default'. With a single shard (the default setting)
+everything is on 'default' and none of this changes behaviour.
+
+Requests are routed without asking every shard:
+
+- creators are placed once through the CreatorShard directory;
+- voucher codes start with a letter naming their shard (G for shard1, H for
+  shard2, ...), and codes on 'default' keep their plain hex form;
+- primary keys on shard N start at N * SHARD_ID_SPAN, so ids are globally
+  unique and name their shard;
+- hold keys carry the shard index in their low bits.
+
+Only superadmin views that cover every creator scatter the query to all
+shards in parallel and gather the results.
+"""
+import heapq
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SHARDS = settings.VOUCHER_SHARDS
+
+# Models stored on their creator's shard; everything else is on 'default'
+SHARDED_MODELS = {'voucher', 'voucherbalanceshard', 'transaction', 'voucherhold', 'dailyusage', 'outboxevent'}
+
+# Primary key range of each shard: shard N allocates ids from N * SHARD_ID_SPAN
+SHARD_ID_SPAN = 10 ** 12
+
+# First letter of the codes on shard1, shard2, ...; hex codes never start with these
+CODE_PREFIXES = 'GHIJKLMNOPQRSTUVWXYZ'
+
+# Hold keys keep the shard index in their lowest bits
+HOLD_KEY_SHARD_BITS = 5
+
+if len(SHARDS) > len(CODE_PREFIXES) + 1:
+    raise ValueError(f'At most {len(CODE_PREFIXES) + 1} voucher shards are supported.')
+
+_creator_shards = {}
+
+
+def _placement(creator_id):
+    """Alias creator_id was placed on, or None if they have not been placed yet."""
+    alias = _creator_shards.get(creator_id)
+    if alias is None:
+        from .models import CreatorShard
+
+        alias = CreatorShard.objects.filter(creator_id=creator_id).values_list('alias', flat=True).first()
+        if alias is not None:
+            _creator_shards[creator_id] = alias
+    return alias
+
+
+def shard_for_creator(creator_id):
+    """
+    Alias that creator_id's new vouchers are written to. The first call places
+    the creator: on 'default' if they already have vouchers there (they predate
+    sharding), otherwise by creator id. The placement is recorded and never
+    changes. Only voucher creation should place; reads use creator_read_shard().
+    """
+    if len(SHARDS) == 1:
+        return DEFAULT_DB_ALIAS
+    alias = _placement(creator_id)
+    if alias is None:
+        from .models import CreatorShard, Voucher
+
+        if Voucher.objects.using(DEFAULT_DB_ALIAS).filter(creator_id=creator_id).exists():
+            placement = DEFAULT_DB_ALIAS
+        else:
+            placement = SHARDS[creator_id % len(SHARDS)]
+        entry, _ = CreatorShard.objects.get_or_create(creator_id=creator_id, defaults={'alias': placement})
+        alias = _creator_shards[creator_id] = entry.alias
+    return alias
+
+
+def creator_read_shard(creator_id):
+    """
+    Alias to read creator_id's vouchers from, without placing the creator.
+    Anyone never placed has no vouchers, or only ones on 'default' from before
+    sharding, so 'default' answers for them, with no rows for unknown ids.
+    """
+    if len(SHARDS) == 1:
+        return DEFAULT_DB_ALIAS
+    return _placement(creator_id) or DEFAULT_DB_ALIAS
+
+
+def shard_for_code(code):
+    """Alias holding the voucher with this code, from the code's first letter."""
+    index = CODE_PREFIXES.find(code[:1]) + 1 if code else 0
+    return SHARDS[index] if 0 < index < len(SHARDS) else DEFAULT_DB_ALIAS
+
+
+def shard_for_id(pk):
+    """Alias holding the voucher, transaction or hold with this primary key."""
+    index = int(pk) // SHARD_ID_SPAN
+    return SHARDS[index] if 0 <= index < len(SHARDS) else DEFAULT_DB_ALIAS
+
+
+def shard_for_hold_key(key):
+    """Alias holding the hold with this key."""
+    index = key.int & (2 ** HOLD_KEY_SHARD_BITS - 1)
+    return SHARDS[index] if index < len(SHARDS) else DEFAULT_DB_ALIAS
+
+
+def code_prefix(alias):
+    """Letter the voucher codes on alias start with, or '' for plain codes on 'default'."""
+    index = SHARDS.index(alias)
+    return CODE_PREFIXES[index - 1] if index else ''
+
+
+def new_voucher_code(alias):
+    """Random voucher code that routes to alias."""
+    code = str(uuid.uuid4())[:8].upper()
+    prefix = code_prefix(alias)
+    return prefix + code[1:] if prefix else code
+
+
+def new_hold_key(alias):
+    """Random hold key that routes to alias."""
+    mask = 2 ** HOLD_KEY_SHARD_BITS - 1
+    return uuid.UUID(int=(uuid.uuid4().int & ~mask) | SHARDS.index(alias))
+
+
+def scatter(func, aliases=None):
+    """
+    Call func(alias) for every shard, in parallel threads when there is more
+    than one, and return the results in shard order.
+    """
+    aliases = list(aliases or SHARDS)
+    if len(aliases) == 1:
+        return [func(aliases[0])]
+
+    def run(alias):
+        try:
+            return func(alias)
+        finally:
+            # Each thread opened its own connections
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=len(aliases)) as pool:
+        return list(pool.map(run, aliases))
+
+
+class ScatteredQuerySet:
+    """
+    The same query run on every shard, merged in the query's ordering. Supports
+    what pagination and list serializers need: count(), len(), slicing and
+    iteration. A slice only fetches up to its stop from each shard.
+    """
+
+    def __init__(self, queryset, aliases=None):
+        self.queryset = queryset
+        self.aliases = list(aliases or SHARDS)
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not ordering or len({field.startswith('-') for field in ordering}) > 1:
+            raise ValueError('Scattered queries need an ordering in one direction.')
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.reverse = ordering[0].startswith('-')
+
+    def _key(self, obj):
+        return tuple(getattr(obj, field) for field in self.fields)
+
+    def _merged(self, limit=None):
+        parts = scatter(lambda alias: list(self.queryset.using(alias)[:limit]), self.aliases)
+        return heapq.merge(*parts, key=self._key, reverse=self.reverse)
+
+    def count(self):
+        return sum(scatter(lambda alias: self.queryset.using(alias).count(), self.aliases))
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self._merged())
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        return list(islice(self._merged(stop), start, stop))
+
+
+class ShardRouter:
+    """
+    Sends models that are not sharded to 'default'. Sharded models follow the
+    instance they are reached from, and are otherwise placed explicitly with
+    .using(); a query on them without either runs against 'default'.
+    """
+
+    def _db(self, model):
+        if model._meta.model_name not in SHARDED_MODELS or model._meta.app_label != 'vouchers':
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db(model)
+
+    def db_for_write(self, model, **hints):
+        return self._db(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Sharded rows point at users and at rows on their own shard only
+        if self._db(type(obj1)) or self._db(type(obj2)):
+            return True
+        return None
+
+
+def reserve_id_ranges(using, **kwargs):
+    """
+    post_migrate handler: start the primary keys of sharded tables on shard N
+    at N * SHARD_ID_SPAN, unless rows beyond that exist already.
+    """
+    from django.apps import apps
+
+    if using not in SHARDS or SHARDS.index(using) == 0:
+        return
+    start = SHARDS.index(using) * SHARD_ID_SPAN
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for model_name in SHARDED_MODELS:
+            table = apps.get_model('vouchers', model_name)._meta.db_table
+            if connection.vendor == 'sqlite':
+                cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s', [start, table, start])
+                cursor.execute(
+                    'INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s '
+                    'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)',
+                    [table, start, table]
+                )
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    f'SELECT setval(pg_get_serial_sequence(%s, %s), '
+                    f'GREATEST(%s, (SELECT COALESCE(MAX(id), 0) + 1 FROM {connection.ops.quote_name(table)})), false)',
+                    [connection.ops.quote_name(table), 'id', start]
+                )
+            elif connection.vendor == 'mysql':
+                cursor.execute(f'ALTER TABLE {connection.ops.quote_name(table)} AUTO_INCREMENT = {start}')
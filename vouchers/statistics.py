@@ -0,0 +1,81 @@
+"""Dashboard statistics and the incremental deltas pushed to live dashboards."""
+from django.db.models import Sum
+
+from .models import Voucher, VoucherBalanceShard
+from .money import as_rupees, to_paisa
+from .sharding import creator_read_shard, scatter
+
+# Balance effect of each transaction type
+TRANSACTION_SIGNS = {'recharge': 1, 'release': 1, 'payment': -1, 'hold': -1}
+
+
+def shard_statistics(alias, creator_id=None):
+    """compute_statistics() for the vouchers on one shard, with the balance in paisa."""
+    # Get all vouchers (including disabled)
+    all_vouchers = Voucher.objects.using(alias)
+    shard_rows = VoucherBalanceShard.objects.using(alias)
+    if creator_id is not None:
+        all_vouchers = all_vouchers.filter(creator_id=creator_id)
+        shard_rows = shard_rows.filter(voucher__creator_id=creator_id)
+
+    # Get non-disabled vouchers
+    active_vouchers = all_vouchers.filter(is_disabled=False)
+
+    # Calculate total balance from active vouchers only
+    total_balance = active_vouchers.aggregate(
+        total=Sum('current_balance')
+    )['total'] or 0
+    # Sharded vouchers keep their balance in shard rows
+    total_balance += shard_rows.filter(voucher__is_disabled=False).aggregate(
+        total=Sum('balance')
+    )['total'] or 0
+
+    return {
+        'total_vouchers': all_vouchers.count(),
+        'active_vouchers': active_vouchers.count(),
+        'disabled_vouchers': all_vouchers.filter(is_disabled=True).count(),
+        'sold_vouchers': all_vouchers.filter(is_sold=True).count(),
+        'total_balance': total_balance
+    }
+
+
+def compute_statistics(creator_id=None):
+    """
+    Voucher counts and the total balance of non-disabled vouchers, across all
+    shards or for one creator's vouchers.
+    """
+    totals = {}
+    aliases = None if creator_id is None else [creator_read_shard(creator_id)]
+    for shard in scatter(lambda alias: shard_statistics(alias, creator_id), aliases):
+        for key, value in shard.items():
+            totals[key] = totals.get(key, 0) + value
+    totals['total_balance'] = as_rupees(totals['total_balance'])
+    return totals
+
+
+def statistics_delta(event):
+    """
+    Change an outbox event makes to compute_statistics(), or None if it makes none.
+    Only non-zero entries are included.
+    """
+    voucher = event.payload['voucher']
+    balance = to_paisa(voucher['current_balance'])
+    delta = {}
+
+    if event.event_type == 'voucher.created':
+        delta = {'total_vouchers': 1, 'active_vouchers': 1}
+    elif event.event_type == 'voucher.disabled':
+        delta = {'active_vouchers': -1, 'disabled_vouchers': 1, 'total_balance': -balance}
+    elif event.event_type == 'voucher.enabled':
+        delta = {'active_vouchers': 1, 'disabled_vouchers': -1, 'total_balance': balance}
+    elif event.event_type == 'voucher.sold':
+        delta = {'sold_vouchers': 1}
+    elif event.event_type == 'transaction.created' and not voucher['is_disabled']:
+        transaction = event.payload['transaction']
+        sign = TRANSACTION_SIGNS.get(transaction['transaction_type'], 0)
+        delta = {'total_balance': sign * to_paisa(transaction['amount'])}
+
+    delta = {key: value for key, value in delta.items() if value}
+    if 'total_balance' in delta:
+        delta['total_balance'] = as_rupees(delta['total_balance'])
+    return delta or None
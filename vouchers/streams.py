@@ -0,0 +1,186 @@
+"""
+Server-Sent Events for live dashboards.
+
+Outbox events are the source of truth: one poller per event loop reads new
+rows and fans them out to every connected dashboard, so the database sees one
+indexed query per poll interval regardless of how many tabs are open.
+
+Each shard has its own outbox, so a position in the stream is a cursor
+holding the last event id seen on every shard. It is sent as the SSE id,
+comma separated in shard order; with a single shard it is just that id.
+"""
+import asyncio
+import json
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import OutboxEvent
+from .money import as_rupees
+from .sharding import SHARDS
+from .statistics import shard_statistics, statistics_delta
+
+# Reconnecting clients that missed more than this many events are told to reload
+CATCH_UP_LIMIT = 500
+
+
+def parse_cursor(value):
+    """Cursor from an SSE id sent back by a client, or None if it is not one of ours."""
+    ids = (value or '').split(',')
+    if len(ids) != len(SHARDS) or not all(event_id.isdigit() for event_id in ids):
+        return None
+    return [int(event_id) for event_id in ids]
+
+
+def _format_cursor(cursor):
+    return ','.join(str(event_id) for event_id in cursor)
+
+
+def _events_after(cursor, limit):
+    """Up to limit events past cursor from each shard, each shard's in id order."""
+    events = []
+    for alias, last_id in zip(SHARDS, cursor):
+        events += OutboxEvent.objects.using(alias).filter(id__gt=last_id).order_by('id')[:limit]
+    return events
+
+
+def _latest_event_id(alias):
+    latest = OutboxEvent.objects.using(alias).order_by('-id').values_list('id', flat=True).first()
+    return latest or 0
+
+
+def _latest_cursor():
+    return [_latest_event_id(alias) for alias in SHARDS]
+
+
+def _snapshot(creator_id=None):
+    """Current statistics, overall or for one creator, and the cursor of the last events they include."""
+    cursor, totals = [], {}
+    for alias in SHARDS:
+        with transaction.atomic(using=alias):
+            cursor.append(_latest_event_id(alias))
+            for key, value in shard_statistics(alias, creator_id).items():
+                totals[key] = totals.get(key, 0) + value
+    totals['total_balance'] = as_rupees(totals['total_balance'])
+    return cursor, totals
+
+
+class EventBroadcaster:
+    """Polls the outbox while anyone is subscribed and hands each batch of new events to every subscriber."""
+
+    def __init__(self, poll_interval):
+        self.poll_interval = poll_interval
+        self.subscribers = set()
+        self.task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=100)
+        self.subscribers.add(queue)
+        if self.task is None:
+            self.task = asyncio.create_task(self._poll())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    async def _poll(self):
+        try:
+            cursor = await sync_to_async(_latest_cursor)()
+            while self.subscribers:
+                events = await sync_to_async(_events_after)(cursor, CATCH_UP_LIMIT)
+                if events:
+                    for event in events:
+                        cursor[SHARDS.index(event._state.db)] = event.id
+                    for queue in list(self.subscribers):
+                        try:
+                            queue.put_nowait(events)
+                        except asyncio.QueueFull:
+                            # Too slow to keep up; the client reconnects and catches up from Last-Event-ID
+                            self.subscribers.discard(queue)
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            self.task = None
+
+
+_broadcasters = weakref.WeakKeyDictionary()
+
+
+def get_broadcaster():
+    """The broadcaster for the running event loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _broadcasters:
+        _broadcasters[loop] = EventBroadcaster(settings.EVENT_STREAM_POLL_INTERVAL)
+    return _broadcasters[loop]
+
+
+def _message(event_name, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines.append(f'event: {event_name}')
+    lines.append('data: ' + json.dumps(data, cls=DjangoJSONEncoder))
+    return '\n'.join(lines) + '\n\n'
+
+
+def _messages_for(user, event, event_id):
+    """
+    SSE messages for one outbox event, scoped to what user may see. Superusers
+    get every event; admins only their own vouchers' events and statistics.
+    """
+    if not (user.is_superuser or event.creator_id == user.id):
+        return []
+    name = 'transaction' if event.event_type == 'transaction.created' else 'voucher'
+    messages = [_message(name, {'type': event.event_type, **event.payload}, event_id)]
+
+    delta = statistics_delta(event)
+    if delta:
+        messages.append(_message('statistics_delta', delta, event_id))
+    return messages
+
+
+async def event_source(user, cursor=None):
+    """
+    Async iterator of SSE messages for one dashboard connection.
+
+    Fresh connections start with a full 'statistics' snapshot, scoped like
+    GET /api/statistics/; reconnections
+    with Last-Event-ID, parsed by parse_cursor(), resume from where they left off. The stream ends after
+    EVENT_STREAM_MAX_SECONDS and the browser reconnects automatically.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.EVENT_STREAM_MAX_SECONDS
+    yield f'retry: {settings.EVENT_STREAM_RETRY_MS}\n\n'
+
+    if cursor is None:
+        cursor, stats = await sync_to_async(_snapshot)(None if user.is_superuser else user.id)
+        yield _message('statistics', stats, _format_cursor(cursor))
+
+    broadcaster = get_broadcaster()
+    queue = broadcaster.subscribe()
+    try:
+        backlog = await sync_to_async(_events_after)(cursor, CATCH_UP_LIMIT + 1)
+        if len(backlog) > CATCH_UP_LIMIT:
+            yield _message('reset', {'reason': 'Too many missed events, reload required'})
+            return
+
+        while True:
+            for event in backlog:
+                shard = SHARDS.index(event._state.db)
+                if event.id > cursor[shard]:
+                    cursor[shard] = event.id
+                    for message in _messages_for(user, event, _format_cursor(cursor)):
+                        yield message
+
+            remaining = deadline - loop.time()
+            if remaining <= 0 or (queue.empty() and queue not in broadcaster.subscribers):
+                return
+            try:
+                backlog = await asyncio.wait_for(
+                    queue.get(), min(remaining, settings.EVENT_STREAM_HEARTBEAT_SECONDS)
+                )
+            except asyncio.TimeoutError:
+                backlog = []
+                yield ': ping\n\n'
+    finally:
+        broadcaster.unsubscribe(queue)
@@ -0,0 +1,269 @@
+import asyncio
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db.models import Sum
+from django.test import LiveServerTestCase, TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from koshya_client import KoshyaClient, KoshyaError
+from koshya_client._common import MAX_BATCH_SIZE
+from koshya_client.aio import AsyncKoshyaClient
+
+from . import sharding, views
+from .models import CreatorShard, DailyUsage, InsufficientBalance, Transaction, Voucher
+from .serializers import VoucherImportRowSerializer
+
+
+class KoshyaClientLiveServerTests(LiveServerTestCase):
+    """koshya_client against the API served by the Django test server."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'password123', is_staff=True)
+        self.voucher = Voucher.objects.create(creator=self.admin, current_balance=100000, total_loaded=100000)
+        self.client = KoshyaClient(f'{self.live_server_url}/api', flush_interval=60)
+        self.addCleanup(self.client.close)
+        # Record every HTTP exchange the client makes
+        self.exchanges = []
+        send = self.client.session.request
+
+        def recording_request(method, url, **kwargs):
+            response = send(method, url, **kwargs)
+            self.exchanges.append((method, url.removeprefix(self.client.base_url), response.status_code))
+            return response
+
+        self.client.session.request = recording_request
+
+    def balance(self):
+        self.voucher.refresh_balance()
+        return self.voucher.balance
+
+    def test_debits_are_submitted_in_batches(self):
+        self.client.batch_size = 2
+        futures = [self.client.debit(self.voucher.code, '1.50') for _ in range(5)]
+        self.client.flush()
+
+        results = [future.result(timeout=10) for future in futures]
+        self.assertTrue(all(result['status'] == 'ok' for result in results))
+        self.assertEqual(
+            [exchange for exchange in self.exchanges if exchange[1] == '/pay/batch/'],
+            [('POST', '/pay/batch/', 200)] * 3,
+        )
+        self.assertEqual(self.balance(), 100000 - 5 * 150)
+
+    def test_batch_size_is_capped_at_the_server_limit(self):
+        client = KoshyaClient(f'{self.live_server_url}/api', batch_size=MAX_BATCH_SIZE * 5)
+        self.addCleanup(client.close)
+        self.assertEqual(client.batch_size, MAX_BATCH_SIZE)
+
+        futures = [client.debit(self.voucher.code, '0.01') for _ in range(MAX_BATCH_SIZE + 1)]
+        client.flush()
+        self.assertTrue(all(future.result(timeout=10)['status'] == 'ok' for future in futures))
+        self.assertEqual(self.balance(), 100000 - (MAX_BATCH_SIZE + 1))
+
+    def test_balance_is_revalidated_with_etag(self):
+        path = f'/vouchers/{self.voucher.code}/balance/'
+        first = self.client.get_balance(self.voucher.code)
+        second = self.client.get_balance(self.voucher.code)
+        self.assertEqual(first, second)
+        self.assertEqual(self.exchanges, [('GET', path, 200), ('GET', path, 304)])
+
+        # A payment invalidates the cached copy and changes the ETag
+        self.client.pay(self.voucher.code, '10.00')
+        self.assertEqual(self.client.get_balance(self.voucher.code)['balance'], 990.0)
+        self.assertEqual(self.exchanges[-1], ('GET', path, 200))
+
+    def test_failed_requests_are_retried_with_backoff(self):
+        process_payment = views._process_payment
+        calls = []
+
+        def flaky_process_payment(data):
+            # The first attempt is charged but its response is lost; the next one is refused
+            calls.append(data)
+            body, status_code = process_payment(data)
+            return (body, status.HTTP_503_SERVICE_UNAVAILABLE) if len(calls) <= 2 else (body, status_code)
+
+        delays = []
+        with mock.patch.object(views, '_process_payment', flaky_process_payment), \
+                mock.patch('koshya_client.client.backoff_delay', side_effect=lambda attempt: delays.append(attempt) or 0):
+            result = self.client.pay(self.voucher.code, '25.00', reference='retry-1')
+
+        self.assertEqual([exchange[2] for exchange in self.exchanges], [503, 503, 200])
+        self.assertEqual(delays, [0, 1])
+        self.assertEqual(result['remaining_balance'], 975.0)
+        # The reference made the retries replay the first attempt instead of charging again
+        self.assertEqual(Transaction.objects.filter(reference='retry-1').count(), 1)
+        self.assertEqual(self.balance(), 100000 - 2500)
+
+    def test_retries_stop_after_max_retries(self):
+        self.client.max_retries = 1
+        with mock.patch.object(views, '_process_payment', return_value=({}, status.HTTP_503_SERVICE_UNAVAILABLE)), \
+                mock.patch('koshya_client.client.backoff_delay', return_value=0):
+            with self.assertRaises(KoshyaError) as raised:
+                self.client.pay(self.voucher.code, '1.00')
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(len(self.exchanges), 2)
+
+    def test_reference_reused_for_a_different_payment_conflicts(self):
+        self.client.pay(self.voucher.code, '5.00', reference='order-7')
+        with self.assertRaises(KoshyaError) as raised:
+            self.client.pay(self.voucher.code, '6.00', reference='order-7')
+        self.assertEqual(raised.exception.status_code, 409)
+        self.assertEqual(self.balance(), 100000 - 500)
+
+    def test_payments_missing_from_a_batch_response_fail(self):
+        self.client.batch_size = 3
+        futures = [self.client.debit(self.voucher.code, '1.00') for _ in range(3)]
+        short_response = {'results': [{'reference': None, 'status': 'ok'}]}
+        with mock.patch.object(self.client, '_json', return_value=short_response):
+            self.client.flush()
+
+        self.assertEqual(futures[0].result(timeout=1)['status'], 'ok')
+        for future in futures[1:]:
+            self.assertIsInstance(future.exception(timeout=1), KoshyaError)
+
+
+class AsyncKoshyaClientLiveServerTests(LiveServerTestCase):
+    """koshya_client.aio against the API served by the Django test server."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'password123', is_staff=True)
+        self.voucher = Voucher.objects.create(creator=self.admin, current_balance=100000, total_loaded=100000)
+
+    async def _exercise(self):
+        exchanges = []
+        async with AsyncKoshyaClient(f'{self.live_server_url}/api', batch_size=2, flush_interval=60) as client:
+            send = client.http.request
+
+            async def recording_request(method, url, **kwargs):
+                response = await send(method, url, **kwargs)
+                exchanges.append((method, url.removeprefix(client.base_url), response.status_code))
+                return response
+
+            client.http.request = recording_request
+
+            futures = [client.debit(self.voucher.code, '2.00') for _ in range(3)]
+            await client.flush()
+            results = await asyncio.gather(*futures)
+
+            first = await client.get_balance(self.voucher.code)
+            second = await client.get_balance(self.voucher.code)
+        return exchanges, results, first, second
+
+    def test_batches_and_etag_revalidation(self):
+        exchanges, results, first, second = asyncio.run(self._exercise())
+
+        self.assertTrue(all(result['status'] == 'ok' for result in results))
+        path = f'/vouchers/{self.voucher.code}/balance/'
+        self.assertEqual(exchanges, [
+            ('POST', '/pay/batch/', 200),
+            ('POST', '/pay/batch/', 200),
+            ('GET', path, 200),
+            ('GET', path, 304),
+        ])
+        self.assertEqual(first, second)
+        self.assertEqual(first['balance'], 994.0)
+
+
+class VoucherCreateTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'password123', is_staff=True)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.admin).key)
+
+    def test_initial_value_must_be_positive(self):
+        for value in ('-5', '0'):
+            response = self.api.post('/api/vouchers/', {'initial_value': value}, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Voucher.objects.exists())
+
+    def test_voucher_is_not_kept_when_its_initial_recharge_fails(self):
+        with mock.patch.object(Transaction.objects, 'create', side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.api.post('/api/vouchers/', {'initial_value': '5'}, format='json')
+        self.assertFalse(Voucher.objects.exists())
+
+
+class BalanceShardTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'password123', is_staff=True)
+        self.voucher = Voucher.objects.create(creator=self.admin)
+        Transaction.objects.create(voucher=self.voucher, amount=1000, transaction_type='recharge')
+        self.voucher.set_balance_shards(4)
+
+    def pay(self, amount):
+        return Transaction.objects.create(voucher=self.voucher, amount=amount, transaction_type='payment')
+
+    def test_debit_larger_than_any_shard_rebalances(self):
+        self.pay(700)
+        self.assertEqual(sorted(self.voucher.shards.values_list('balance', flat=True)), [75, 75, 75, 75])
+        with self.assertRaises(InsufficientBalance):
+            self.pay(301)
+        self.pay(300)
+        self.voucher.refresh_balance()
+        self.assertEqual(self.voucher.balance, 0)
+
+    def test_usage_rollup_is_spread_over_slots(self):
+        for _ in range(20):
+            self.pay(10)
+        usage = DailyUsage.objects.filter(creator=self.admin, transaction_type='payment')
+        self.assertGreater(usage.count(), 1)
+        self.assertEqual(usage.aggregate(count=Sum('transaction_count'), total=Sum('total_amount')),
+                         {'count': 20, 'total': 200})
+
+
+class VoucherSearchTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'password123', is_staff=True)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.admin).key)
+
+    def search(self, prefix):
+        response = self.api.get('/api/vouchers/search/', {'code': prefix})
+        self.assertEqual(response.status_code, 200)
+        return [row['code'] for row in response.data['results']]
+
+    def test_code_prefix_ignores_the_case_of_generated_codes(self):
+        Voucher.objects.create(creator=self.admin, code='E98A1B2C')
+        Voucher.objects.create(creator=self.admin, code='gold10')
+        self.assertEqual(self.search('e98'), ['E98A1B2C'])
+        self.assertEqual(self.search('E98'), ['E98A1B2C'])
+        self.assertEqual(self.search('gold'), ['gold10'])
+
+
+class CreatorShardLookupTests(TestCase):
+    def setUp(self):
+        self.superuser = User.objects.create_superuser('root', 'root@example.com', 'password123')
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.superuser).key)
+        # Reads must find the right shard without placing anyone, even with several shards
+        patcher = mock.patch.object(sharding, 'SHARDS', ['default', 'shard1', 'shard2'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_for_unknown_creators_are_empty_and_place_nobody(self):
+        response = self.api.get('/api/statistics/timeseries/', {'creator': 999})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['series'], [])
+
+        response = self.api.get('/api/vouchers/search/', {'creator': 999})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+        self.assertFalse(CreatorShard.objects.exists())
+
+
+class VoucherImportCodeTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'password123', is_staff=True)
+
+    def validate(self, code):
+        row = VoucherImportRowSerializer(data={'code': code, 'initial_value': '10'}, context={'creator_id': self.admin.id})
+        return row.is_valid()
+
+    def test_codes_on_default_never_use_a_shard_letter(self):
+        # GOLD10 would route to shard1 as soon as sharding is turned on
+        self.assertFalse(self.validate('GOLD10'))
+        self.assertFalse(self.validate('ZED'))
+        self.assertTrue(self.validate('FEST10'))
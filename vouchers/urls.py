@@ -11,20 +11,47 @@ urlpatterns = [
         path('register/', views.register_user, name='register'),
         path('get-token/', views.get_token, name='get-token'),
 
+    # Live dashboard updates (Server-Sent Events)
+    path('events/', views.event_stream, name='event-stream'),
+    path('events/ticket/', views.create_stream_ticket, name='event-stream-ticket'),
+
     # Statistics
     path('statistics/', views.get_statistics, name='statistics'),
+    path('statistics/timeseries/', views.get_usage_timeseries, name='statistics-timeseries'),
+
+    # Event webhooks
+    path('webhook/', views.webhook_endpoint, name='webhook-endpoint'),
+
+    # Background jobs
+    path('jobs/', views.jobs, name='jobs'),
+    path('jobs/<int:pk>/', views.job_detail, name='job-detail'),
+    path('jobs/<int:pk>/cancel/', views.cancel_job, name='cancel-job'),
+    path('jobs/<int:pk>/download/', views.download_job_file, name='job-download'),
+
+    # Request profiles (superadmin)
+    path('profiles/', views.profiles, name='profiles'),
+    path('profiles/<int:pk>/', views.profile_detail, name='profile-detail'),
+    path('profiles/<int:pk>/download/', views.download_profile, name='profile-download'),
 
     # Voucher management
     path('vouchers/', views.VoucherListCreateView.as_view(), name='voucher-list-create'),
     path('vouchers/disabled/', views.get_disabled_vouchers, name='disabled-vouchers'),
     path('vouchers/sold/', views.get_sold_vouchers, name='sold-vouchers'),
+    path('vouchers/search/', views.VoucherSearchView.as_view(), name='voucher-search'),
     path('vouchers/<int:pk>/', views.VoucherDetailView.as_view(), name='voucher-detail'),
     path('vouchers/<int:pk>/enable/', views.enable_voucher, name='enable-voucher'),
     path('vouchers/<int:pk>/mark-sold/', views.mark_voucher_sold, name='mark-voucher-sold'),
+    path('vouchers/<int:pk>/shards/', views.set_voucher_shards, name='voucher-shards'),
     path('vouchers/<str:code>/recharge/', views.recharge_voucher, name='voucher-recharge'),
 
     # Public payment endpoint
     path('pay/', views.make_payment, name='make-payment'),
+    path('pay/batch/', views.make_batch_payment, name='make-batch-payment'),
+
+    # Public balance leases (holds)
+    path('holds/', views.place_hold, name='place-hold'),
+    path('holds/<uuid:key>/', views.get_hold, name='hold-detail'),
+    path('holds/<uuid:key>/settle/', views.settle_hold, name='settle-hold'),
     
     # Public balance check endpoint
     path('vouchers/<str:code>/balance/', views.check_voucher_balance, name='check-balance'),
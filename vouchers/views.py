@@ -3,16 +3,44 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.core import signing
+from django.db import IntegrityError, transaction as db_transaction
 from django.shortcuts import render
-from django.http import JsonResponse
-from .models import Voucher, Transaction
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, JsonResponse
+from .models import (
+    Voucher, Transaction, DailyUsage, VoucherHold, OutboxEvent, WebhookEndpoint,
+    InsufficientBalance, Job, RequestProfile
+)
 from .serializers import (
     VoucherSerializer, VoucherCreateSerializer, VoucherRechargeSerializer,
-    PaymentSerializer, TransactionSerializer
+    TransactionSerializer, HoldCreateSerializer,
+    HoldSettleSerializer, VoucherHoldSerializer, PaymentBatchSerializer,
+    WebhookEndpointSerializer, VoucherShardsSerializer, JobSerializer, JobCreateSerializer,
+    VoucherSearchSerializer, VoucherSearchResultSerializer,
+    RequestProfileSerializer, RequestProfileDetailSerializer
+)
+from .fastpath import (
+    fast_api_view, json_response, parse_body, validate_payment, voucher_with_holds_released
 )
-from .permissions import IsAdminOrSuperAdmin
+from .money import as_rupees, format_rupees, to_paisa
+from .permissions import IsAdminOrSuperAdmin, IsSuperAdmin
+from .sharding import (
+    ScatteredQuerySet, creator_read_shard, scatter, shard_for_code, shard_for_hold_key, shard_for_id
+)
+from .statistics import compute_statistics
+
+
+def _user_vouchers(user, **filters):
+    """
+    Vouchers the user may see matching filters: their own, on their shard, or
+    for superadmins every voucher, gathered from all shards.
+    """
+    if user.is_superuser:
+        return ScatteredQuerySet(Voucher.objects.filter(**filters))
+    return Voucher.objects.using(creator_read_shard(user.id)).filter(creator=user, **filters)
 
 
 @api_view(['POST'])
@@ -109,18 +137,58 @@ class VoucherListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Return vouchers based on user permissions."""
-        if self.request.user.is_superuser:
-            # Superadmin sees all non-disabled, non-sold vouchers
-            return Voucher.objects.filter(is_disabled=False, is_sold=False)
-        else:
-            # Admin sees only their own non-disabled, non-sold vouchers
-            return Voucher.objects.filter(creator=self.request.user, is_disabled=False, is_sold=False)
+        # Superadmin sees all non-disabled, non-sold vouchers, admin only their own
+        return _user_vouchers(self.request.user, is_disabled=False, is_sold=False)
     
     def perform_create(self, serializer):
         """Create voucher with authenticated user as creator."""
         serializer.save(creator=self.request.user)
 
 
+class VoucherSearchView(generics.ListAPIView):
+    """
+    Search vouchers by code prefix, balance, creation and sale dates, and status.
+    Each filter is served by an index on Voucher; results are paginated, newest first.
+    GET /api/vouchers/search/?code=&min_balance=&max_balance=&created_after=&created_before=
+        &sold_after=&sold_before=&status=active|sold|disabled|all&creator= (superadmin only)
+    """
+    serializer_class = VoucherSearchResultSerializer
+    permission_classes = [IsAuthenticated, IsAdminOrSuperAdmin]
+
+    def get_queryset(self):
+        params = VoucherSearchSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+
+        # Creators are on 'default', so they cannot be joined in on other shards
+        vouchers = Voucher.objects.prefetch_related('creator')
+        aliases = None
+        if self.request.user.is_superuser:
+            if 'creator' in filters:
+                vouchers = vouchers.filter(creator_id=filters['creator'])
+                aliases = [creator_read_shard(filters['creator'])]
+        else:
+            vouchers = vouchers.filter(creator=self.request.user)
+            aliases = [creator_read_shard(self.request.user.id)]
+
+        vouchers = vouchers.filter(**VoucherSearchSerializer.STATUS_FILTERS.get(filters['status'], {}))
+        if filters.get('code'):
+            vouchers = vouchers.code_prefix(filters['code'])
+        if 'min_balance' in filters or 'max_balance' in filters:
+            vouchers = vouchers.balance_between(filters.get('min_balance'), filters.get('max_balance'))
+        if 'created_after' in filters:
+            vouchers = vouchers.filter(created_at__gte=filters['created_after'])
+        if 'created_before' in filters:
+            vouchers = vouchers.filter(created_at__lt=filters['created_before'])
+        if 'sold_after' in filters:
+            vouchers = vouchers.filter(sold_at__gte=filters['sold_after'])
+        if 'sold_before' in filters:
+            vouchers = vouchers.filter(sold_at__lt=filters['sold_before'])
+        if aliases:
+            return vouchers.using(aliases[0])
+        return ScatteredQuerySet(vouchers)
+
+
 class VoucherDetailView(generics.RetrieveDestroyAPIView):
     """
     Retrieve or delete a specific voucher.
@@ -131,11 +199,12 @@ class VoucherDetailView(generics.RetrieveDestroyAPIView):
     permission_classes = [IsAuthenticated, IsAdminOrSuperAdmin]
     
     def get_queryset(self):
-        """Return vouchers based on user permissions."""
+        """Return vouchers based on user permissions, on the shard the id belongs to."""
+        vouchers = Voucher.objects.using(shard_for_id(self.kwargs['pk'])).filter(is_disabled=False)
         if self.request.user.is_superuser:
-            return Voucher.objects.filter(is_disabled=False)
+            return vouchers
         else:
-            return Voucher.objects.filter(creator=self.request.user, is_disabled=False)
+            return vouchers.filter(creator=self.request.user)
     
     def destroy(self, request, *args, **kwargs):
         """Disable the voucher instead of deleting it."""
@@ -143,7 +212,9 @@ class VoucherDetailView(generics.RetrieveDestroyAPIView):
         instance = self.get_object()
         instance.is_disabled = True
         instance.disabled_at = timezone.now()
-        instance.save()
+        with db_transaction.atomic(using=instance._state.db):
+            instance.save(update_fields=['is_disabled', 'disabled_at', 'updated_at'])
+            OutboxEvent.record('voucher.disabled', instance)
         
         return Response({
             'message': f'Voucher {instance.code} has been disabled successfully',
@@ -160,10 +231,12 @@ def enable_voucher(request, pk):
     POST /api/vouchers/<id>/enable/
     """
     try:
-        voucher = Voucher.objects.get(pk=pk, is_disabled=True)
+        voucher = Voucher.objects.using(shard_for_id(pk)).get(pk=pk, is_disabled=True)
         voucher.is_disabled = False
         voucher.disabled_at = None
-        voucher.save()
+        with db_transaction.atomic(using=voucher._state.db):
+            voucher.save(update_fields=['is_disabled', 'disabled_at', 'updated_at'])
+            OutboxEvent.record('voucher.enabled', voucher)
         
         return Response({
             'message': f'Voucher {voucher.code} has been enabled successfully',
@@ -182,10 +255,7 @@ def get_sold_vouchers(request):
     Get sold vouchers for the authenticated user.
     GET /api/vouchers/sold/
     """
-    if request.user.is_superuser:
-        vouchers = Voucher.objects.filter(is_sold=True)
-    else:
-        vouchers = Voucher.objects.filter(creator=request.user, is_sold=True)
+    vouchers = _user_vouchers(request.user, is_sold=True)
     
     serializer = VoucherSerializer(vouchers, many=True)
     return Response(serializer.data)
@@ -199,11 +269,13 @@ def mark_voucher_sold(request, pk):
     POST /api/vouchers/<id>/mark-sold/
     """
     try:
-        voucher = Voucher.objects.get(pk=pk, is_disabled=False, is_sold=False)
+        voucher = Voucher.objects.using(shard_for_id(pk)).get(pk=pk, is_disabled=False, is_sold=False)
         from django.utils import timezone
         voucher.is_sold = True
         voucher.sold_at = timezone.now()
-        voucher.save()
+        with db_transaction.atomic(using=voucher._state.db):
+            voucher.save(update_fields=['is_sold', 'sold_at', 'updated_at'])
+            OutboxEvent.record('voucher.sold', voucher)
         
         return Response({
             'message': f'Voucher {voucher.code} has been marked as sold',
@@ -216,6 +288,38 @@ def mark_voucher_sold(request, pk):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminOrSuperAdmin])
+def set_voucher_shards(request, pk):
+    """
+    Split a busy voucher's balance across several rows so concurrent payments
+    do not queue up on one, or merge it back with shards=0.
+    POST /api/vouchers/<id>/shards/
+    """
+    try:
+        voucher = Voucher.objects.using(shard_for_id(pk)).get(pk=pk)
+    except Voucher.DoesNotExist:
+        return Response({'error': 'Voucher not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if not request.user.is_superuser and voucher.creator != request.user:
+        return Response(
+            {'error': 'You can only shard your own vouchers'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    serializer = VoucherShardsSerializer(data=request.data)
+    if serializer.is_valid():
+        voucher.set_balance_shards(serializer.validated_data['shards'])
+        return Response({
+            'message': f'Voucher {voucher.code} now uses {voucher.balance_shards} balance shards',
+            'voucher_code': voucher.code,
+            'balance_shards': voucher.balance_shards,
+            'balance': as_rupees(voucher.balance)
+        }, status=status.HTTP_200_OK)
+
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdminOrSuperAdmin])
 def get_disabled_vouchers(request):
@@ -223,10 +327,7 @@ def get_disabled_vouchers(request):
     Get disabled vouchers for the authenticated user.
     GET /api/vouchers/disabled/
     """
-    if request.user.is_superuser:
-        vouchers = Voucher.objects.filter(is_disabled=True)
-    else:
-        vouchers = Voucher.objects.filter(creator=request.user, is_disabled=True)
+    vouchers = _user_vouchers(request.user, is_disabled=True)
     
     serializer = VoucherSerializer(vouchers, many=True)
     return Response(serializer.data)
@@ -237,33 +338,90 @@ def get_disabled_vouchers(request):
 def get_statistics(request):
     """
     Get voucher statistics including disabled vouchers.
+    Admins see their own vouchers, superadmins everyone's.
     GET /api/statistics/
     """
-    from django.db.models import Sum, Count
-    
-    # Get all vouchers (including disabled)
-    all_vouchers = Voucher.objects.all()
-    
-    # Get non-disabled vouchers
-    active_vouchers = all_vouchers.filter(is_disabled=False)
-    
-    # Calculate statistics
-    total_vouchers = all_vouchers.count()
-    active_vouchers_count = active_vouchers.count()
-    disabled_vouchers_count = all_vouchers.filter(is_disabled=True).count()
-    sold_vouchers_count = all_vouchers.filter(is_sold=True).count()
-    
-    # Calculate total balance from active vouchers only
-    total_balance = active_vouchers.aggregate(
-        total=Sum('current_balance')
-    )['total'] or 0
-    
+    return Response(compute_statistics(None if request.user.is_superuser else request.user.id))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminOrSuperAdmin])
+def get_usage_timeseries(request):
+    """
+    Get daily payment and recharge totals from the pre-aggregated rollups.
+    GET /api/statistics/timeseries/?start=YYYY-MM-DD&end=YYYY-MM-DD
+    Optional filters: transaction_type, creator (superadmin only)
+    """
+    from datetime import timedelta
+    from django.db.models import Sum
+    from django.utils import timezone
+    from django.utils.dateparse import parse_date
+
+    try:
+        end = parse_date(request.query_params.get('end', '')) or timezone.localdate()
+        start = parse_date(request.query_params.get('start', '')) or end - timedelta(days=29)
+    except ValueError:
+        return Response(
+            {'error': 'start and end must be valid dates in YYYY-MM-DD format'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if start > end:
+        return Response(
+            {'error': 'start must be on or before end'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    rollups = DailyUsage.objects.filter(day__range=(start, end))
+    aliases = None
+
+    if request.user.is_superuser:
+        creator = request.query_params.get('creator')
+        if creator:
+            if not creator.isdigit():
+                return Response(
+                    {'error': 'creator must be a user id'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            rollups = rollups.filter(creator_id=creator)
+            aliases = [creator_read_shard(int(creator))]
+    else:
+        rollups = rollups.filter(creator=request.user)
+        aliases = [creator_read_shard(request.user.id)]
+
+    transaction_type = request.query_params.get('transaction_type')
+    if transaction_type:
+        rollups = rollups.filter(transaction_type=transaction_type)
+
+    rollups = (
+        rollups.values('day', 'transaction_type')
+        .annotate(count=Sum('transaction_count'), total=Sum('total_amount'))
+        .order_by('day', 'transaction_type')
+    )
+
+    # Sum each shard's series into one
+    rows = {}
+    for shard_rows in scatter(lambda alias: list(rollups.using(alias)), aliases):
+        for row in shard_rows:
+            key = (row['day'], row['transaction_type'])
+            if key in rows:
+                rows[key]['count'] += row['count']
+                rows[key]['total'] += row['total']
+            else:
+                rows[key] = row
+    rows = [rows[key] for key in sorted(rows)]
+
     return Response({
-        'total_vouchers': total_vouchers,
-        'active_vouchers': active_vouchers_count,
-        'disabled_vouchers': disabled_vouchers_count,
-        'sold_vouchers': sold_vouchers_count,
-        'total_balance': float(total_balance)
+        'start': start,
+        'end': end,
+        'series': [
+            {
+                'day': row['day'],
+                'transaction_type': row['transaction_type'],
+                'count': row['count'],
+                'total_amount': as_rupees(row['total']),
+            }
+            for row in rows
+        ]
     })
 
 
@@ -275,7 +433,7 @@ def recharge_voucher(request, code):
     POST /api/vouchers/<code>/recharge/
     """
     try:
-        voucher = Voucher.objects.get(code=code)
+        voucher = Voucher.objects.using(shard_for_code(code)).get(code=code)
     except Voucher.DoesNotExist:
         return Response(
             {'error': 'Voucher not found'}, 
@@ -296,90 +454,510 @@ def recharge_voucher(request, code):
         # Create recharge transaction
         transaction = Transaction.objects.create(
             voucher=voucher,
-            amount=amount,
+            amount=to_paisa(amount),
             transaction_type='recharge',
             description=f'Recharge of Rs {amount}'
         )
         
         return Response({
             'message': f'Voucher {code} recharged with Rs {amount}',
-            'new_balance': voucher.current_balance,
+            'new_balance': as_rupees(voucher.balance),
             'transaction': TransactionSerializer(transaction).data
         }, status=status.HTTP_200_OK)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def make_payment(request):
+def _payment_response(transaction):
+    """Build the make_payment response body for a recorded payment."""
+    return {
+        'message': f'Payment of Rs {format_rupees(transaction.amount)} successful',
+        'voucher_code': transaction.voucher.code,
+        'remaining_balance': as_rupees(transaction.voucher.balance),
+        'transaction_id': transaction.id
+    }
+
+
+def _process_payment(data):
     """
-    Public endpoint to make payment using voucher.
-    POST /api/pay/
+    Validate and record a single payment.
+    Payments carrying a reference that was already recorded are replayed instead
+    of charged again, so clients can retry safely. References are looked up on
+    the shard of the voucher code they are sent with.
+    Returns (response body, status code).
     """
-    serializer = PaymentSerializer(data=request.data)
-    if serializer.is_valid():
-        voucher = serializer.context['voucher']
-        amount = serializer.validated_data['amount']
-        
+    reference = data.get('reference') if hasattr(data, 'get') else None
+    transactions = Transaction.objects.select_related('voucher')
+    if reference:
+        transactions = transactions.using(shard_for_code(str(data.get('voucher_code') or '')))
+        existing = transactions.filter(reference=reference).first()
+        if existing:
+            return _replay_payment(existing, data)
+
+    validated, errors = validate_payment(data)
+    if errors:
+        return errors, status.HTTP_400_BAD_REQUEST
+
+    voucher = validated['voucher']
+    amount = validated['amount']
+
+    try:
         # Create payment transaction
         transaction = Transaction.objects.create(
             voucher=voucher,
             amount=amount,
             transaction_type='payment',
-            description=f'Payment of Rs {amount}'
+            description=f'Payment of Rs {format_rupees(amount)}',
+            reference=reference or None
         )
-        
+    except IntegrityError:
+        # A concurrent retry recorded the same reference first
+        return _replay_payment(transactions.get(reference=reference), data)
+    except InsufficientBalance as exc:
+        # A concurrent payment spent the balance after validation
+        return {'non_field_errors': [str(exc)]}, status.HTTP_400_BAD_REQUEST
+
+    return _payment_response(transaction), status.HTTP_200_OK
+
+
+def _replay_payment(transaction, data):
+    """
+    Result of a payment whose reference was already recorded. A reference reused
+    for a different voucher or amount is a client bug, not a retry, and gets 409.
+    """
+    try:
+        same_amount = to_paisa(data.get('amount')) == transaction.amount
+    except ValueError:
+        same_amount = False
+    if transaction.transaction_type != 'payment' or not same_amount or (
+        str(data.get('voucher_code') or '').strip() != transaction.voucher.code
+    ):
+        return {
+            'error': 'This reference was already used for a different payment',
+            'reference': transaction.reference,
+        }, status.HTTP_409_CONFLICT
+    return _payment_response(transaction), status.HTTP_200_OK
+
+
+@fast_api_view(['POST'])
+def make_payment(request):
+    """
+    Public endpoint to make payment using voucher.
+    Served by the lean fast path (see fastpath.py) rather than DRF.
+    POST /api/pay/
+    """
+    data, error_response = parse_body(request)
+    if error_response is not None:
+        return error_response
+    body, status_code = _process_payment(data)
+    return json_response(body, status=status_code)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def make_batch_payment(request):
+    """
+    Public endpoint to submit several payments in one request.
+    Each payment is validated and committed on its own, so one failure
+    does not reject the rest of the batch.
+    POST /api/pay/batch/
+    """
+    serializer = PaymentBatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    results = []
+    for payment in serializer.validated_data['payments']:
+        body, status_code = _process_payment(payment)
+        if status_code == status.HTTP_200_OK:
+            results.append({'reference': payment.get('reference'), 'status': 'ok', **body})
+        else:
+            results.append({'reference': payment.get('reference'), 'status': 'error', 'errors': body})
+
+    return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def place_hold(request):
+    """
+    Public endpoint to reserve part of a voucher's balance for local consumption.
+    POST /api/holds/
+    """
+    serializer = HoldCreateSerializer(data=request.data)
+    if serializer.is_valid():
+        voucher = serializer.context['voucher']
+        try:
+            hold = VoucherHold.place(
+                voucher,
+                serializer.validated_data['amount'],
+                serializer.validated_data['ttl_seconds']
+            )
+        except InsufficientBalance as exc:
+            return Response({'non_field_errors': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+
         return Response({
-            'message': f'Payment of Rs {amount} successful',
+            'message': f'Hold of Rs {format_rupees(hold.amount)} placed',
+            'hold_id': hold.key,
             'voucher_code': voucher.code,
-            'remaining_balance': voucher.current_balance,
-            'transaction_id': transaction.id
-        }, status=status.HTTP_200_OK)
-    
+            'amount': as_rupees(hold.amount),
+            'expires_at': hold.expires_at,
+            'remaining_balance': as_rupees(voucher.balance)
+        }, status=status.HTTP_201_CREATED)
+
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _get_hold(key):
+    """
+    Hold by key from the shard the key names, falling back to 'default' where
+    holds placed before sharding are. Raises VoucherHold.DoesNotExist.
+    """
+    for alias in dict.fromkeys([shard_for_hold_key(key), 'default']):
+        try:
+            return VoucherHold.objects.using(alias).select_related('voucher').get(key=key)
+        except VoucherHold.DoesNotExist:
+            pass
+    raise VoucherHold.DoesNotExist
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+def get_hold(request, key):
+    """
+    Public endpoint to check the state of a hold.
+    GET /api/holds/<hold_id>/
+    """
+    try:
+        hold = _get_hold(key)
+    except VoucherHold.DoesNotExist:
+        return Response({'error': 'Hold not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response(VoucherHoldSerializer(hold).data)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def settle_hold(request, key):
+    """
+    Public endpoint to settle a hold with the amount actually used.
+    The unused remainder is returned to the voucher.
+    POST /api/holds/<hold_id>/settle/
+    """
+    try:
+        hold = _get_hold(key)
+    except VoucherHold.DoesNotExist:
+        return Response({'error': 'Hold not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    serializer = HoldSettleSerializer(data=request.data, context={'hold': hold})
+    if serializer.is_valid():
+        amount_used = serializer.validated_data['amount_used']
+
+        if not hold.settle(amount_used):
+            return Response(
+                {'error': 'Hold is no longer active'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        return Response({
+            'message': f'Hold settled with Rs {format_rupees(amount_used)} used',
+            'hold_id': hold.key,
+            'voucher_code': hold.voucher.code,
+            'amount_used': as_rupees(amount_used),
+            'amount_released': as_rupees(hold.amount - amount_used),
+            'remaining_balance': as_rupees(hold.voucher.balance)
+        }, status=status.HTTP_200_OK)
+
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@fast_api_view(['GET'])
 def check_voucher_balance(request, code):
     """
     Public endpoint to check voucher balance.
+    Responses carry an ETag; send it back in If-None-Match to get
+    304 Not Modified while the balance and status are unchanged.
+    Served by the lean fast path (see fastpath.py) rather than DRF.
     GET /api/vouchers/<code>/balance/
     """
     try:
-        voucher = Voucher.objects.get(code=code)
+        voucher = voucher_with_holds_released(code)
         
         # Check if voucher is disabled or sold
         if voucher.is_disabled:
-            return Response({
+            body = {
                 'voucher_code': voucher.code,
-                'balance': float(voucher.current_balance),
+                'balance': as_rupees(voucher.balance),
                 'status': 'disabled',
                 'message': 'Voucher is disabled'
-            }, status=status.HTTP_200_OK)
-        
-        if voucher.is_sold:
-            return Response({
+            }
+        elif voucher.is_sold:
+            body = {
                 'voucher_code': voucher.code,
-                'balance': float(voucher.current_balance),
+                'balance': as_rupees(voucher.balance),
                 'status': 'sold',
                 'message': 'Voucher has been sold'
-            }, status=status.HTTP_200_OK)
-        
-        return Response({
-            'voucher_code': voucher.code,
-            'balance': float(voucher.current_balance),
-            'status': 'active',
-            'message': 'Voucher is active and ready for use'
-        }, status=status.HTTP_200_OK)
+            }
+        else:
+            body = {
+                'voucher_code': voucher.code,
+                'balance': as_rupees(voucher.balance),
+                'status': 'active',
+                'message': 'Voucher is active and ready for use'
+            }
         
     except Voucher.DoesNotExist:
-        return Response({
+        return json_response({
             'error': 'Voucher not found',
             'voucher_code': code
         }, status=status.HTTP_404_NOT_FOUND)
 
+    etag = _balance_etag(body)
+    if etag in request.headers.get('If-None-Match', ''):
+        return HttpResponseNotModified(headers={'ETag': etag})
+
+    return json_response(body, status=status.HTTP_200_OK, headers={'ETag': etag})
+
+
+def _balance_etag(body):
+    """Strong ETag for a balance response, derived from the fields that can change."""
+    import hashlib
+    digest = hashlib.sha1(f"{body['voucher_code']}:{body['balance']}:{body['status']}".encode()).hexdigest()
+    return f'"{digest[:16]}"'
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated, IsAdminOrSuperAdmin])
+def webhook_endpoint(request):
+    """
+    Manage the webhook that receives events for the authenticated user's vouchers.
+    GET /api/webhook/
+    PUT /api/webhook/ - Create or update (url, is_active)
+    DELETE /api/webhook/
+    """
+    endpoint = WebhookEndpoint.objects.filter(creator=request.user).first()
+
+    if request.method == 'GET':
+        if endpoint is None:
+            return Response({'error': 'No webhook configured'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(WebhookEndpointSerializer(endpoint).data)
+
+    if request.method == 'DELETE':
+        if endpoint is None:
+            return Response({'error': 'No webhook configured'}, status=status.HTTP_404_NOT_FOUND)
+        endpoint.delete()
+        return Response({'message': 'Webhook removed'}, status=status.HTTP_200_OK)
+
+    serializer = WebhookEndpointSerializer(endpoint, data=request.data, partial=endpoint is not None)
+    if serializer.is_valid():
+        serializer.save(creator=request.user)
+        return Response(
+            serializer.data,
+            status=status.HTTP_200_OK if endpoint else status.HTTP_201_CREATED
+        )
+
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _job_for(request, pk):
+    """The job with pk if the user may see it: their own, or any for superadmins."""
+    jobs = Job.objects.all() if request.user.is_superuser else Job.objects.filter(creator=request.user)
+    return jobs.filter(pk=pk).first()
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated, IsAdminOrSuperAdmin])
+def jobs(request):
+    """
+    List recent background jobs or queue a new one.
+    Jobs are run by the run_jobs management command; poll the job to follow progress.
+    GET /api/jobs/
+    POST /api/jobs/ - kind: bulk_create (initial_value, count), import (CSV file), export, reconcile
+    """
+    if request.method == 'GET':
+        queryset = Job.objects.all() if request.user.is_superuser else Job.objects.filter(creator=request.user)
+        return Response(JobSerializer(queryset[:50], many=True).data)
+
+    serializer = JobCreateSerializer(data=request.data, context={'request': request})
+    if serializer.is_valid():
+        job = serializer.save()
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminOrSuperAdmin])
+def job_detail(request, pk):
+    """
+    Get the status and progress of a background job.
+    GET /api/jobs/<id>/
+    """
+    job = _job_for(request, pk)
+    if job is None:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(JobSerializer(job).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminOrSuperAdmin])
+def cancel_job(request, pk):
+    """
+    Cancel a queued or running job. Chunks already committed are kept.
+    POST /api/jobs/<id>/cancel/
+    """
+    job = _job_for(request, pk)
+    if job is None:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    from django.utils import timezone
+    cancelled = Job.objects.filter(pk=job.pk, status__in=['queued', 'running']).update(
+        status='cancelled', finished_at=timezone.now()
+    )
+    if not cancelled:
+        return Response({'error': 'Job has already finished'}, status=status.HTTP_409_CONFLICT)
+
+    job.refresh_from_db()
+    return Response(JobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminOrSuperAdmin])
+def download_job_file(request, pk):
+    """
+    Download the CSV produced by a completed export job.
+    GET /api/jobs/<id>/download/
+    """
+    job = _job_for(request, pk)
+    if job is None or job.kind != 'export' or job.status != 'completed':
+        return Response({'error': 'No completed export with this id'}, status=status.HTTP_404_NOT_FOUND)
+
+    return FileResponse(
+        open(job.cursor['path'], 'rb'),
+        as_attachment=True,
+        filename=f'vouchers-export-{job.id}.csv',
+        content_type='text/csv'
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def profiles(request):
+    """
+    List the most recent request profiles, newest first.
+    Requests are profiled when a superadmin sends X-Profile: 1, or at PROFILE_SAMPLE_RATE.
+    GET /api/profiles/?view=<view name contains>&path=<path starts with>
+    """
+    queryset = RequestProfile.objects.select_related('user').defer('stacks', 'queries')
+    if request.query_params.get('view'):
+        queryset = queryset.filter(view__contains=request.query_params['view'])
+    if request.query_params.get('path'):
+        queryset = queryset.filter(path__startswith=request.query_params['path'])
+    return Response(RequestProfileSerializer(queryset[:50], many=True).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def profile_detail(request, pk):
+    """
+    Get a request profile with the SQL statements it ran.
+    GET /api/profiles/<id>/
+    """
+    profile = RequestProfile.objects.select_related('user').filter(pk=pk).first()
+    if profile is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(RequestProfileDetailSerializer(profile).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def download_profile(request, pk):
+    """
+    Download a request profile's stacks in collapsed format, for flamegraph.pl,
+    speedscope or inferno.
+    GET /api/profiles/<id>/download/
+    """
+    stacks = RequestProfile.objects.filter(pk=pk).values_list('stacks', flat=True).first()
+    if stacks is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    return HttpResponse(
+        stacks,
+        content_type='text/plain; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename="profile-{pk}.collapsed"'}
+    )
+
+
+STREAM_TICKET_SALT = 'vouchers.event-stream'
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminOrSuperAdmin])
+def create_stream_ticket(request):
+    """
+    Issue a short-lived ticket for opening the event stream. EventSource cannot
+    send headers, so browsers pass the ticket in the URL instead of their token.
+    POST /api/events/ticket/
+    """
+    return Response({
+        'ticket': signing.dumps(request.user.pk, salt=STREAM_TICKET_SALT),
+        'expires_in': settings.EVENT_STREAM_TICKET_SECONDS,
+    })
+
+
+def _token_user(key):
+    try:
+        return Token.objects.select_related('user').get(key=key).user
+    except Token.DoesNotExist:
+        return None
+
+
+def _ticket_user(ticket):
+    try:
+        user_id = signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=settings.EVENT_STREAM_TICKET_SECONDS)
+    except signing.BadSignature:
+        return None
+    return User.objects.filter(pk=user_id, is_active=True).first()
+
+
+async def event_stream(request):
+    """
+    Server-Sent Events stream of voucher, transaction and statistics changes.
+    Admins receive their own vouchers' changes, superadmins everyone's.
+    Authenticated by an Authorization header or a ticket from POST /api/events/ticket/.
+    GET /api/events/?ticket=<ticket>
+    """
+    from asgiref.sync import sync_to_async
+    from django.core.handlers.asgi import ASGIRequest
+    from django.http import StreamingHttpResponse
+    from .streams import event_source, parse_cursor
+
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'The event stream is only available from the ASGI server'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+
+    ticket = request.GET.get('ticket')
+    key = request.headers.get('Authorization', '').removeprefix('Token ')
+    if ticket:
+        user = await sync_to_async(_ticket_user)(ticket)
+    else:
+        user = await sync_to_async(_token_user)(key) if key else None
+    if user is None or not (user.is_staff or user.is_superuser):
+        return JsonResponse(
+            {'error': 'Invalid credentials or insufficient permissions'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    cursor = parse_cursor(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+
+    return StreamingHttpResponse(
+        event_source(user, cursor),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 
 # Frontend Views
 def dashboard_view(request):
@@ -0,0 +1,242 @@
+"""
+Batched, signed delivery of outbox events to creators' webhook endpoints.
+
+Endpoints are registered by creators, so the URL is untrusted: it must be
+https and its host must resolve only to public addresses. This is checked
+when the endpoint is saved and again on every connection, against the
+address actually connected to, so DNS changes and redirects cannot point a
+delivery at the server's own network.
+"""
+import hashlib
+import hmac
+import http.client
+import ipaddress
+import json
+import os
+import socket
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import OutboxEvent, WebhookEndpoint
+from .sharding import SHARDS
+
+SIGNATURE_HEADER = 'X-Koshya-Signature'
+TIMESTAMP_HEADER = 'X-Koshya-Timestamp'
+
+
+class UnsafeWebhookURL(ValueError):
+    """A webhook URL that is not https or does not lead to a public address."""
+
+
+def is_public_address(address):
+    """True unless address is private, loopback, link-local, reserved or multicast."""
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def check_url(url):
+    """Raise UnsafeWebhookURL unless url is https and every address its host resolves to is public."""
+    parts = urlsplit(url)
+    if parts.scheme != 'https' or not parts.hostname:
+        raise UnsafeWebhookURL('Webhook URLs must use https.')
+    try:
+        infos = socket.getaddrinfo(parts.hostname, parts.port or 443, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError, ValueError):
+        raise UnsafeWebhookURL(f'Cannot resolve {parts.hostname}.')
+    for info in infos:
+        if not is_public_address(info[4][0]):
+            raise UnsafeWebhookURL(
+                f'{parts.hostname} resolves to a private, loopback or link-local address ({info[4][0]}).'
+            )
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPS connection that hangs up on any peer that is not a public address, before sending a byte."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = self._create_public_connection
+
+    def _create_public_connection(self, address, *args, **kwargs):
+        sock = socket.create_connection(address, *args, **kwargs)
+        peer = sock.getpeername()[0]
+        if not is_public_address(peer):
+            sock.close()
+            raise UnsafeWebhookURL(f'{self.host} connected to non-public address {peer}.')
+        return sock
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Report redirects as failed deliveries instead of following them."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+# No proxies, so the connected peer is the endpoint itself
+_opener = urllib.request.build_opener(
+    urllib.request.ProxyHandler({}), _NoRedirectHandler(), _PublicHTTPSHandler()
+)
+
+
+def sign(secret, timestamp, body):
+    """
+    HMAC-SHA256 over "<timestamp>.<body>".
+    Receivers should recompute it and reject stale timestamps.
+    """
+    message = f'{timestamp}.'.encode() + body
+    return 'sha256=' + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def retry_delay(attempts):
+    """Exponential backoff for failed deliveries, capped at one hour."""
+    return timedelta(seconds=min(3600, 5 * (2 ** (attempts - 1))))
+
+
+def post_events(endpoint, events):
+    """
+    POST a batch of events to an endpoint. Raises on network errors, non-2xx
+    responses and URLs that fail check_url().
+    """
+    check_url(endpoint.url)
+    body = json.dumps({
+        'events': [
+            {
+                'id': event.id,
+                'type': event.event_type,
+                'created_at': event.created_at,
+                'data': event.payload,
+            }
+            for event in events
+        ]
+    }, cls=DjangoJSONEncoder).encode()
+    timestamp = str(int(time.time()))
+
+    request = urllib.request.Request(endpoint.url, data=body, method='POST', headers={
+        'Content-Type': 'application/json',
+        'User-Agent': 'Koshya-Webhooks/1.0',
+        TIMESTAMP_HEADER: timestamp,
+        SIGNATURE_HEADER: sign(endpoint.secret, timestamp, body),
+    })
+    with _opener.open(request, timeout=settings.WEBHOOK_TIMEOUT):
+        pass
+
+
+def deliver_pending(batch_size=100):
+    """
+    Deliver one round of due events from every shard, one batch per creator.
+    Returns a dict of counts by outcome.
+    """
+    counts = {'delivered': 0, 'skipped': 0, 'retrying': 0, 'failed': 0}
+    for alias in SHARDS:
+        for outcome, count in _deliver_shard(alias, batch_size).items():
+            counts[outcome] += count
+    return counts
+
+
+def _deliver_shard(alias, batch_size):
+    """
+    deliver_pending() for the events on one shard; a creator's events are all on
+    one. Each creator's batch is claimed before it is sent, so concurrent workers
+    never send the same event, and claims left by a worker that died are
+    returned to the queue once they are WEBHOOK_CLAIM_SECONDS old.
+    """
+    now = timezone.now()
+    outbox = OutboxEvent.objects.using(alias)
+    outbox.filter(status='sending', next_attempt_at__lte=now).update(status='pending', worker='')
+    worker = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+    due = list(
+        outbox.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('id')[:batch_size * 10]
+    )
+
+    by_creator = defaultdict(list)
+    for event in due:
+        if len(by_creator[event.creator_id]) < batch_size:
+            by_creator[event.creator_id].append(event)
+
+    endpoints = WebhookEndpoint.objects.in_bulk(
+        [creator_id for creator_id in by_creator], field_name='creator_id'
+    )
+    counts = {'delivered': 0, 'skipped': 0, 'retrying': 0, 'failed': 0}
+
+    for creator_id, events in by_creator.items():
+        ids = [event.id for event in events]
+        endpoint = endpoints.get(creator_id)
+
+        if endpoint is None or not endpoint.is_active:
+            counts['skipped'] += outbox.filter(id__in=ids, status='pending').update(
+                status='skipped', delivered_at=now
+            )
+            continue
+
+        outbox.filter(id__in=ids, status='pending').update(
+            status='sending',
+            worker=worker,
+            next_attempt_at=timezone.now() + timedelta(seconds=settings.WEBHOOK_CLAIM_SECONDS),
+        )
+        # Only the events this worker claimed; another worker may have taken the rest
+        events = list(outbox.filter(id__in=ids, status='sending', worker=worker).order_by('id'))
+        if not events:
+            continue
+        ids = [event.id for event in events]
+
+        try:
+            post_events(endpoint, events)
+        except (urllib.error.URLError, http.client.HTTPException, OSError, ValueError) as exc:
+            # HTTPException (e.g. BadStatusLine, IncompleteRead) reaches us unwrapped from getresponse()
+            _record_failure(events, str(exc) or type(exc).__name__)
+            failed = sum(1 for event in events if event.status == 'failed')
+            counts['failed'] += failed
+            counts['retrying'] += len(events) - failed
+        else:
+            outbox.filter(id__in=ids, status='sending', worker=worker).update(
+                status='delivered', delivered_at=timezone.now(), last_error='', worker=''
+            )
+            counts['delivered'] += len(ids)
+
+    return counts
+
+
+def _record_failure(events, error):
+    now = timezone.now()
+    for event in events:
+        event.attempts += 1
+        event.last_error = error[:1000]
+        event.worker = ''
+        if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            event.status = 'failed'
+        else:
+            event.status = 'pending'
+            event.next_attempt_at = now + retry_delay(event.attempts)
+    OutboxEvent.objects.using(events[0]._state.db).bulk_update(
+        events, ['attempts', 'last_error', 'status', 'worker', 'next_attempt_at']
+    )
+
+
+def purge_finished(retention_days=None):
+    """Delete delivered, skipped and failed events older than the retention window, on every shard."""
+    days = settings.OUTBOX_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = 0
+    for alias in SHARDS:
+        deleted += OutboxEvent.objects.using(alias).filter(
+            status__in=['delivered', 'skipped', 'failed'], created_at__lt=cutoff
+        ).delete()[0]
+    return deleted